@@ -0,0 +1,61 @@
+import logging
+import threading
+from collections import deque
+
+from flask import has_request_context
+from flask.globals import request_ctx
+
+import logs
+
+log = logging.getLogger('spy.actor')
+
+
+class RoomActor:
+    """Bir odanın olaylarını sırayla uygulayan tek-yazar (single-writer) kuyruğu.
+
+    Olayı gönderen thread, kuyruğu işleyen başka biri yoksa kuyruğu kendisi
+    boşaltır; varsa olay kuyruğa eklenir ve o thread tarafından sırayla
+    çalıştırılır. Farklı odaların olayları paralel, aynı odanınkiler geliş
+    sırasıyla işlenir. Oda başına ek thread açılmaz.
+
+    Socket.IO handler'larının `request.sid` ve `emit()` kullanabilmesi için
+    başka bir thread'de çalıştırılan olayın istek bağlamı kopyalanıp yüklenir.
+    """
+
+    __slots__ = ('_mailbox', '_lock', '_running')
+
+    def __init__(self):
+        self._mailbox = deque()
+        self._lock = threading.Lock()
+        self._running = False
+
+    def submit(self, fn, *args):
+        """Olayı kuyruğa ekler; kuyruğu bu thread işlediyse True döner"""
+        ctx = request_ctx._get_current_object() if has_request_context() else None
+        with self._lock:
+            self._mailbox.append((fn, args, ctx, threading.get_ident()))
+            if self._running:
+                return False
+            self._running = True
+        self._drain()
+        return True
+
+    def pending(self):
+        return len(self._mailbox)
+
+    def _drain(self):
+        me = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._mailbox:
+                    self._running = False
+                    return
+                fn, args, ctx, owner = self._mailbox.popleft()
+            try:
+                if ctx is None or owner == me:
+                    fn(*args)
+                else:
+                    with ctx.copy():
+                        fn(*args)
+            except Exception:
+                log.exception('room event failed', extra=logs.fields(event=getattr(fn, '__name__', repr(fn))))
@@ -0,0 +1,118 @@
+import random
+import string
+import threading
+
+# generate_room_id ile aynı karakter kümesi
+ROOM_CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+
+class ShuffledPool:
+    """0..size-1 arasındaki sayıları rastgele sırayla veren serbest liste.
+
+    Fisher-Yates karıştırması tembel yapılır: yalnızca yeri değişen konumlar
+    bir sözlükte tutulur. Çekme ve geri koyma O(1), bellek kullanımı havuzun
+    boyutuyla değil dışarıdaki sayı adediyle orantılıdır.
+    """
+
+    def __init__(self, size, rng=random):
+        self.size = size
+        self._rng = rng
+        self._free = size
+        self._swaps = {}
+
+    def __len__(self):
+        return self._free
+
+    def take(self):
+        """Havuzdan rastgele bir sayı çeker, havuz boşsa IndexError"""
+        if not self._free:
+            raise IndexError('pool is empty')
+        index = self._rng.randrange(self._free)
+        last = self._free - 1
+        if index == last:
+            value = self._swaps.pop(last, last)
+        else:
+            value = self._swaps.get(index, index)
+            self._swaps[index] = self._swaps.pop(last, last)
+        self._free = last
+        return value
+
+    def put(self, value):
+        """Çekilmiş bir sayıyı havuza geri koyar"""
+        if value != self._free:
+            self._swaps[self._free] = value
+        self._free += 1
+
+    def reset(self):
+        """Tüm sayıları havuza geri koyar"""
+        self._free = self.size
+        self._swaps.clear()
+
+
+class RoomCodeAllocator:
+    """Kullanılmayan oda kodlarını O(1)'de veren ve geri alan dağıtıcı.
+
+    `accept` verilirse yalnızca onu sağlayan kodlar dağıtılır (ör. bu worker'ın
+    bölümüne düşen kodlar); reddedilen kodlar havuza geri konmaz.
+    """
+
+    def __init__(self, length=4, accept=None, capacity=None):
+        self.length = length
+        self._accept = accept
+        self._pool = ShuffledPool(len(ROOM_CODE_ALPHABET) ** length)
+        self._lock = threading.Lock()
+        self.capacity = capacity or self._pool.size
+        self.in_use = 0
+        # reserve() ile kullanıma alınmış ama havuzdan çekilmemiş kodlar
+        self._reserved = set()
+
+    def allocate(self):
+        """Boştaki bir kodu döner; kod alanı tükenmişse IndexError"""
+        with self._lock:
+            while True:
+                code = self._encode(self._pool.take())
+                if code in self._reserved:
+                    # Zaten kullanımda; artık havuzdan da çekilmiş oldu
+                    self._reserved.discard(code)
+                    continue
+                if self._accept is None or self._accept(code):
+                    self.in_use += 1
+                    return code
+
+    def reserve(self, code):
+        """Belirli bir kodu kullanımda işaretler (ör. snapshot'tan geri yüklenen oda).
+
+        Kod havuzdan hemen çıkarılmaz; `allocate` onu çekerse atlar.
+        """
+        with self._lock:
+            self._reserved.add(code)
+            self.in_use += 1
+
+    def release(self, code):
+        """Silinen odanın kodunu havuza geri koyar"""
+        with self._lock:
+            if code in self._reserved:
+                self._reserved.discard(code)  # hiç çekilmemişti, zaten havuzda
+            else:
+                self._pool.put(self._decode(code))
+            self.in_use -= 1
+
+    def stats(self):
+        return {
+            'in_use': self.in_use,
+            'capacity': self.capacity,
+            'occupancy': round(self.in_use / self.capacity, 6)
+        }
+
+    def _encode(self, number):
+        chars = []
+        for _ in range(self.length):
+            number, digit = divmod(number, len(ROOM_CODE_ALPHABET))
+            chars.append(ROOM_CODE_ALPHABET[digit])
+        return ''.join(reversed(chars))
+
+    def _decode(self, code):
+        number = 0
+        for char in code:
+            number = number * len(ROOM_CODE_ALPHABET) + ROOM_CODE_ALPHABET.index(char)
+        return number
@@ -1,105 +1,461 @@
-from flask import Flask, render_template, request
+from flask import Flask, Response, abort, jsonify, render_template, request, url_for
 from flask_socketio import SocketIO, emit, join_room, leave_room, rooms
+import functools
+import itertools
+import atexit
+import logging
 import random
+import secrets
+import signal
 import threading
 import time
-import string
 import uuid
+from collections import deque
 from datetime import datetime
 import os
+from scheduler import TimerScheduler
+from cluster import room_owner, queue_options
+from actor import RoomActor
+from allocator import RoomCodeAllocator
+from wordpacks import PackLibrary, WordDeck
+from liveness import Liveness
+from ratelimit import RateLimiter, parse_limits
+from snapshot import SnapshotLog
+from history import HistoryStore, TTLCache
+from lobby import LobbyIndex
+from assets import IMMUTABLE, Asset, AssetPipeline, CONTENT_TYPES
+from profiler import SamplingProfiler
+import metrics
+import fanout
+import logs
+import codec
+import native
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'spy_game_secret_key_2024'
-socketio = SocketIO(app, cors_allowed_origins="*", async_mode='threading')
+# Bağlantısı kopan oyuncunun odadan tamamen silinmesi için beklenen süre (saniye)
+app.config['PLAYER_REMOVE_DELAY'] = int(os.environ.get('PLAYER_REMOVE_DELAY', 600))
+# Yeniden bağlanan istemcilere tekrar gönderilebilecek son oda olayı sayısı
+app.config['EVENT_LOG_SIZE'] = int(os.environ.get('EVENT_LOG_SIZE', 200))
+# Tartışma ve oylama fazlarının süresi (saniye); süre dolunca sunucu bir sonraki faza geçer
+app.config['DISCUSSION_SECONDS'] = int(os.environ.get('DISCUSSION_SECONDS', 180))
+app.config['VOTING_SECONDS'] = int(os.environ.get('VOTING_SECONDS', 90))
+# Kelime paketlerinin dizini ve oda kurulurken paket seçilmezse kullanılan paket
+app.config['WORD_PACK_DIR'] = os.environ.get('WORD_PACK_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'packs'))
+app.config['DEFAULT_WORD_PACK'] = os.environ.get('DEFAULT_WORD_PACK', 'countries')
+# Bu süre boyunca hiçbir olay olmayan odalar silinir; süpürme aralığı (saniye)
+app.config['ROOM_IDLE_TTL'] = int(os.environ.get('ROOM_IDLE_TTL', 7200))
+app.config['ROOM_GC_INTERVAL'] = int(os.environ.get('ROOM_GC_INTERVAL', 60))
+# İstemci heartbeat aralığı (ön plan / arka plan sekme) ve bayat oyuncu tarama aralığı (saniye)
+app.config['HEARTBEAT_INTERVAL'] = int(os.environ.get('HEARTBEAT_INTERVAL', 120))
+app.config['HEARTBEAT_BACKGROUND_INTERVAL'] = int(os.environ.get('HEARTBEAT_BACKGROUND_INTERVAL', 600))
+app.config['LIVENESS_SWEEP_INTERVAL'] = int(os.environ.get('LIVENESS_SWEEP_INTERVAL', 30))
+# Bağlantı başına olay hız sınırları: olay=saniyede jeton/kova boyu (bkz. ratelimit.py)
+app.config['RATE_LIMITS'] = parse_limits(os.environ.get('RATE_LIMITS', ''), {
+    'send_message': (1, 5),
+    'submit_vote': (2, 5),
+    'create_room': (0.2, 3),
+    'join_room': (1, 5),
+    'heartbeat': (0.5, 3),
+    'default': (2, 10),
+})
+# Gelen paketin (byte) ve sohbet mesajının (karakter) üst sınırı
+app.config['MAX_PACKET_BYTES'] = int(os.environ.get('MAX_PACKET_BYTES', 16384))
+app.config['MAX_CHAT_LENGTH'] = int(os.environ.get('MAX_CHAT_LENGTH', 300))
+# Bu süre içinde gelen sohbet satırları tek new_message olarak yayınlanır (saniye, 0 = hemen)
+app.config['CHAT_BATCH_WINDOW'] = float(os.environ.get('CHAT_BATCH_WINDOW', 0.1))
+app.config['CHAT_BATCH_MAX'] = int(os.environ.get('CHAT_BATCH_MAX', 50))
+# Oda snapshot dosyası ({worker} worker indeksiyle değişir, boş = kapalı; gunicorn.conf.py açar)
+# ve yazma aralığı (saniye)
+app.config['SNAPSHOT_PATH'] = os.environ.get('SNAPSHOT_PATH', '')
+app.config['SNAPSHOT_INTERVAL'] = float(os.environ.get('SNAPSHOT_INTERVAL', 5))
+# Oyun geçmişi veritabanı (SQLite, boş = kapalı), toplu yazma boyu/aralığı ve istatistik önbelleği (saniye)
+app.config['HISTORY_DB'] = os.environ.get('HISTORY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'history-{worker}.sqlite3'))
+app.config['HISTORY_BATCH_SIZE'] = int(os.environ.get('HISTORY_BATCH_SIZE', 200))
+app.config['HISTORY_FLUSH_INTERVAL'] = float(os.environ.get('HISTORY_FLUSH_INTERVAL', 1.0))
+app.config['STATS_CACHE_TTL'] = float(os.environ.get('STATS_CACHE_TTL', 30))
+# Lobi sayfa boyu ve abonelere gönderilen güncellemeler arasındaki en kısa süre (saniye)
+app.config['LOBBY_PAGE_SIZE'] = int(os.environ.get('LOBBY_PAGE_SIZE', 20))
+app.config['LOBBY_UPDATE_INTERVAL'] = float(os.environ.get('LOBBY_UPDATE_INTERVAL', 1.0))
+# Log seviyesi, biçimi (text/json), sık olaylar için örnekleme oranları ve kayıt kuyruğu boyu
+app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'text')
+app.config['LOG_SAMPLE'] = os.environ.get('LOG_SAMPLE', 'heartbeat=0.01,submit_vote=0.1')
+app.config['LOG_QUEUE_SIZE'] = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+# Statik dosyalar küçültülüp özetli adla ve önceden sıkıştırılmış sunulur (0 = Flask'ın static'i)
+app.config['ASSET_PIPELINE'] = os.environ.get('ASSET_PIPELINE', '1') == '1'
+# İşlenmiş sayfaların (/, /game/<oda>) önbellekte kalma süresi (saniye)
+app.config['PAGE_CACHE_TTL'] = float(os.environ.get('PAGE_CACHE_TTL', 60))
+# /admin uçlarının anahtarı (boş = kapalı), bu süreyi (ms) aşan handler'ların kaydı (0 = kapalı),
+# profiler'ın en uzun çalışma süresi ve örnekleme aralığı (saniye)
+app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN', '')
+app.config['SLOW_EVENT_MS'] = float(os.environ.get('SLOW_EVENT_MS', 0))
+app.config['PROFILE_MAX_SECONDS'] = float(os.environ.get('PROFILE_MAX_SECONDS', 60))
+app.config['PROFILE_INTERVAL'] = float(os.environ.get('PROFILE_INTERVAL', 0.005))
+# threading, eventlet veya gevent. eventlet/gevent için wsgi.py üzerinden başlatın
+app.config['ASYNC_MODE'] = os.environ.get('ASYNC_MODE', 'threading')
+# Çok process'li çalışma: odalar WORKER_COUNT worker'a room_id ile bölünür (bkz. cluster.py)
+app.config['WORKER_COUNT'] = int(os.environ.get('WORKER_COUNT', 1))
+app.config['WORKER_INDEX'] = int(os.environ.get('WORKER_INDEX', 0))
+# Lobi indeksi process'e özeldir: birden fazla worker varken her worker yalnızca kendi
+# odalarını listelerdi, bu yüzden lobi yalnızca tek worker'lı kurulumda açılır
+app.config['LOBBY_ENABLED'] = (os.environ.get('LOBBY_ENABLED', '1') == '1'
+                               and app.config['WORKER_COUNT'] == 1)
+app.config['MESSAGE_QUEUE'] = os.environ.get('MESSAGE_QUEUE', '')
+# Sayfaların varsayılan Socket.IO kodlaması: json veya msgpack (msgpack paketi kuruluysa)
+app.config['WIRE_CODEC'] = os.environ.get('WIRE_CODEC', 'json')
+# Loglar kuyruğa bırakılır, ayrı bir thread yazar (bkz. logs.py)
+logs.configure(app.config['LOG_LEVEL'], app.config['LOG_FORMAT'], app.config['LOG_SAMPLE'],
+               app.config['LOG_QUEUE_SIZE'])
+log = logging.getLogger('spy.game')
+
+socketio = SocketIO(app, cors_allowed_origins="*", async_mode=app.config['ASYNC_MODE'],
+                    json=metrics.CountingJSON, max_http_buffer_size=app.config['MAX_PACKET_BYTES'],
+                    **queue_options(app.config['MESSAGE_QUEUE']))
+# `codec=msgpack` ile bağlanan istemciler MessagePack, diğerleri JSON kullanır
+msgpack_supported = codec.install(socketio.server)
+if app.config['WIRE_CODEC'] == 'msgpack' and not msgpack_supported:
+    log.warning('WIRE_CODEC=msgpack but the msgpack package is not installed, pages use json',
+                extra=logs.fields(wire_codec=app.config['WIRE_CODEC']))
+
+# Tüm gecikmeli işler tek bir zamanlayıcıda (oyuncu başına thread yok)
+scheduler = TimerScheduler(socketio.start_background_task, socketio.server.eio.create_event)
 
 # Oyun odaları ve durumları
 game_rooms = {}
 
-# Ülkeler listesi (Türkçe) - Daha bilinen ülkeler
-COUNTRIES = [
-    # Avrupa
-    "Almanya", "İngiltere", "Fransa", "İtalya", "İspanya", "Hollanda", "İsviçre", 
-    "İsveç", "Norveç", "Belçika", "Danimarka", "Avusturya", "Finlandiya", "Yunanistan", 
-    "Macaristan", "Portekiz", "Çek Cumhuriyeti", "Polonya", "İrlanda", "Rusya",
-    
-    # Asya
-    "Çin", "Japonya", "Hindistan", "Güney Kore", "Endonezya", "Tayland", "Malezya", 
-    "Singapur", "Filipinler", "Vietnam", "Bangladeş", "Pakistan", "Türkiye",
-    
-    # Amerika
-    "Amerika Birleşik Devletleri", "Kanada", "Meksika", "Brezilya", "Arjantin", 
-    "Şili", "Kolombiya", "Küba", "Venezuela",
+# Session id -> oda id ters indeksi (disconnect/leave için tüm odaları taramamak adına)
+player_rooms = {}
+
+# Olay başına token bucket'lar (session id bazında)
+limiter = RateLimiter(app.config['RATE_LIMITS'])
+
+# Kelime paketleri ilk kullanımda açılır (bkz. wordpacks.py)
+word_packs = PackLibrary(app.config['WORD_PACK_DIR'])
+
+# Bağlantı tazeliği Engine.IO ping/pong'undan okunur (bkz. liveness.py)
+liveness = Liveness(socketio.server, app.config['HEARTBEAT_INTERVAL'],
+                    app.config['HEARTBEAT_BACKGROUND_INTERVAL'])
+
+# Biten oyunlar arka planda toplu yazılır, istatistikler önbellekten sunulur (bkz. history.py)
+history = None
+if app.config['HISTORY_DB']:
+    # Her worker kendi dosyasına yazar, sorgular tüm worker'ların dosyalarını okur
+    history_paths = list(dict.fromkeys(app.config['HISTORY_DB'].format(worker=index)
+                                       for index in range(app.config['WORKER_COUNT'])))
+    history_path = app.config['HISTORY_DB'].format(worker=app.config['WORKER_INDEX'])
+    os.makedirs(os.path.dirname(history_path) or '.', exist_ok=True)
+    history = HistoryStore(history_path, peers=[path for path in history_paths if path != history_path],
+                           batch_size=app.config['HISTORY_BATCH_SIZE'],
+                           flush_interval=app.config['HISTORY_FLUSH_INTERVAL'])
+    atexit.register(history.close)
+stats_cache = TTLCache(app.config['STATS_CACHE_TTL'])
+
+# Küçültülmüş, özetli ve sıkıştırılmış statik dosyalar ile sayfa önbelleği (bkz. assets.py)
+assets = AssetPipeline(app.static_folder) if app.config['ASSET_PIPELINE'] else None
+page_cache = TTLCache(app.config['PAGE_CACHE_TTL'])
+
+# Yavaş handler kayıtları ve isteğe bağlı profiler (ikisi de varsayılan olarak kapalı)
+slow_events = deque(maxlen=200)
+profiler = SamplingProfiler(app.config['PROFILE_INTERVAL'])
+
+# Katılınabilir herkese açık odalar, oda olaylarıyla birlikte güncellenir (bkz. lobby.py)
+lobby = LobbyIndex()
+lobby_subscribers = {}  # session id -> izlediği lobi sayfası
+lobby_pending = False   # abonelere güncelleme planlandı mı ('lobby',)
+
+class Player:
+    """Odadaki bir oyuncunun kaydı (sabit alanlı, oyuncu başına dict yok)"""
+    __slots__ = ('public_id', 'token', 'name', 'is_spy', 'connected', 'voted',
+                 'last_heartbeat', 'background', 'disconnect_time')
     
-    # Afrika ve Orta Doğu
-    "Güney Afrika", "Mısır", "Nijerya", "Fas", "Cezayir", "Suudi Arabistan", 
-    "Birleşik Arap Emirlikleri", "İsrail", "İran", "Irak",
+    def __init__(self, public_id, token, name):
+        self.public_id = public_id  # session id yerine istemcilere gösterilen kimlik
+        self.token = token  # yeniden bağlanırken kimliği geri yüklemek için
+        self.name = name
+        self.is_spy = False
+        self.connected = True
+        self.voted = False
+        self.last_heartbeat = time.time()
+        self.background = False  # sekme arka planda mı (heartbeat aralığını belirler)
+        self.disconnect_time = None
     
-    # Okyanusya
-    "Avustralya", "Yeni Zelanda"
-]
+    def to_public(self):
+        """İstemcilere gönderilen alanlar (rol, token vb. iç alanlar hariç)"""
+        return {'id': self.public_id, 'name': self.name, 'connected': self.connected}
 
 class SpyGameRoom:
-    def __init__(self, room_id, room_name, creator_id, max_players=8):
+    __slots__ = ('room_id', 'room_name', 'creator_id', 'max_players', 'players',
+                 'game_started', 'discussion_phase', 'voting_phase', 'selected_country',
+                 'spy_player', 'spy_count', 'votes', 'created_at', 'last_activity', 'actor',
+                 'name_index', 'vote_count', 'top_votes', 'leaders', 'connected_count',
+                 'voted_count', 'roster_version', 'next_public_id', 'token_index',
+                 'event_log', 'event_seq', 'epoch_seq', 'spy_ids', 'role_info',
+                 'phase_deadline', 'deck', 'chat_batch', 'public')
+    
+    def __init__(self, room_id, room_name, creator_id, max_players=8, pack=None, public=False):
         self.room_id = room_id
         self.room_name = room_name
         self.creator_id = creator_id  # Odayı kuran kişinin ID'si
         self.max_players = max_players
+        self.public = public  # lobide listelenir mi (değilse sadece kodla katılınır)
         self.players = {}
         self.game_started = False
         self.discussion_phase = False
         self.voting_phase = False
         self.selected_country = None
         self.spy_player = None
+        self.spy_ids = []  # bu oyunun casusları (spy_count başta bir kez sayılır)
+        self.role_info = None  # (casus, vatandaş) rol mesajları, oyun başına bir kez kurulur
         self.spy_count = 1  # Varsayılan hain sayısı
         self.votes = {}
-        self.discussion_timer = None
-        self.voting_timer = None
+        self.phase_deadline = None  # aktif fazın bitişi (epoch ms), zamanlayıcıda ('phase', room_id)
+        # Odanın kelime destesi: deste bitene kadar aynı kelime tekrar gelmez
+        self.deck = WordDeck(pack or word_packs.get(app.config['DEFAULT_WORD_PACK']))
+        self.chat_batch = None  # yayınlanmayı bekleyen sohbet satırları, zamanlayıcıda ('chat', room_id)
         self.created_at = datetime.now()
+        self.last_activity = time.monotonic()
+        # Odanın tüm olayları bu kuyruk üzerinden sırayla uygulanır
+        self.actor = RoomActor()
+        
+        # Olaylarla birlikte güncel tutulan indeksler (her oy O(1) olsun diye)
+        self.name_index = {}       # küçük harfli isim -> player_id
+        self.vote_count = {}       # oy verilen isim -> oy sayısı
+        self.top_votes = 0         # lider(ler)in oy sayısı
+        self.leaders = []          # en çok oy alan isimler
+        self.connected_count = 0   # bağlı oyuncu sayısı
+        self.voted_count = 0       # oy vermiş bağlı oyuncu sayısı
+        
+        # Oyuncu listesi her değiştiğinde artan sürüm (istemcilere delta gönderilir)
+        self.roster_version = 0
+        self.next_public_id = 0
+        
+        # Yeniden bağlanma: token -> player_id ve sıra numaralı olay kaydı (ring buffer)
+        self.token_index = {}
+        self.event_log = deque(maxlen=app.config['EVENT_LOG_SIZE'])
+        self.event_seq = 0
+        self.epoch_seq = 0  # son game_reset olayının sıra numarası
         
     def add_player(self, player_id, player_name):
         if len(self.players) >= self.max_players or self.game_started:
             return False
         
-        # Aynı isimde oyuncu var mı kontrol et (bağlı olanlar için)
-        for existing_player in self.players.values():
-            if existing_player['name'].lower() == player_name.lower() and existing_player['connected']:
-                return False  # Aynı isimde bağlı oyuncu var
+        # Aynı isimde bağlı oyuncu var mı kontrol et
+        existing_id = self.name_index.get(player_name.lower())
+        if existing_id is not None and self.players[existing_id].connected:
+            return False  # Aynı isimde bağlı oyuncu var
         
-        self.players[player_id] = {
-            'name': player_name,
-            'is_spy': False,
-            'connected': True,
-            'voted': False
-        }
+        self.next_public_id += 1
+        token = secrets.token_urlsafe(16)
+        self.players[player_id] = Player(self.next_public_id, token, player_name)
+        self.name_index[player_name.lower()] = player_id
+        self.token_index[token] = player_id
+        self.connected_count += 1
+        update_lobby(self)
         return True
     
     def remove_player(self, player_id):
         if player_id in self.players:
-            del self.players[player_id]
+            player = self.players.pop(player_id)
+            if player.connected:
+                self.connected_count -= 1
+                if player.voted:
+                    self.voted_count -= 1
+            if self.name_index.get(player.name.lower()) == player_id:
+                del self.name_index[player.name.lower()]
+            del self.token_index[player.token]
+            if player_rooms.get(player_id) == self.room_id:
+                del player_rooms[player_id]
         if player_id in self.votes:
-            del self.votes[player_id]
+            self._untally(self.votes.pop(player_id))
+        update_lobby(self)
+    
+    def find_player(self, player_name):
+        """İsimden player_id bulur (tam eşleşme), yoksa None"""
+        if not isinstance(player_name, str):
+            return None
+        player_id = self.name_index.get(player_name.lower())
+        if player_id is not None and self.players[player_id].name == player_name:
+            return player_id
+        return None
+    
+    def log_event(self, event, payload):
+        """Oda olayını sıra numarasıyla kaydeder, `seq` eklenmiş payload'ı döner"""
+        self.event_seq += 1
+        payload = dict(payload, seq=self.event_seq)
+        self.event_log.append((self.event_seq, event, payload))
+        if event == 'game_reset':
+            self.epoch_seq = self.event_seq
+        return payload
+    
+    def events_since(self, last_seq):
+        """`last_seq`'ten sonraki olaylar (son sıfırlamadan öncekiler atlanır).
+        
+        Kayıt tamponu kaçırılan olayları artık tutmuyorsa None döner.
+        """
+        if last_seq > self.event_seq:
+            return None
+        start = max(last_seq, self.epoch_seq - 1)
+        if start >= self.event_seq:
+            return []
+        first_seq = self.event_log[0][0] if self.event_log else self.event_seq + 1
+        if first_seq > start + 1:
+            return None
+        return list(itertools.islice(self.event_log, start + 1 - first_seq, None))
+    
+    def to_public(self):
+        """Oda bilgisinin istemcilere gönderilen kısmı"""
+        return {
+            'room_id': self.room_id,
+            'room_name': self.room_name,
+            'spy_count': self.spy_count,
+            'max_players': self.max_players,
+            'pack': self.deck.pack.name,
+            'pack_title': self.deck.pack.title
+        }
+    
+    def to_lobby(self):
+        """Lobi listesindeki satır"""
+        return {
+            'room_id': self.room_id,
+            'room_name': self.room_name,
+            'player_count': len(self.players),
+            'max_players': self.max_players,
+            'spy_count': self.spy_count,
+            'pack_title': self.deck.pack.title
+        }
+    
+    def to_state(self):
+        """Snapshot'a yazılan kalıcı durum (olay kaydı, deste ve bağlantılar hariç)"""
+        return {
+            'id': self.room_id,
+            'name': self.room_name,
+            'creator': self.creator_id,
+            'max_players': self.max_players,
+            'spy_count': self.spy_count,
+            'pack': self.deck.pack.name,
+            'public': self.public,
+            'started': self.game_started,
+            'discussion': self.discussion_phase,
+            'voting': self.voting_phase,
+            'word': self.selected_country,
+            'spy_ids': self.spy_ids,
+            'deadline': self.phase_deadline,
+            'votes': self.votes,
+            'roster_version': self.roster_version,
+            'next_public_id': self.next_public_id,
+            'seq': self.event_seq,
+            'epoch_seq': self.epoch_seq,
+            'players': [[pid, p.public_id, p.token, p.name, p.is_spy, p.voted]
+                        for pid, p in self.players.items()]
+        }
+    
+    @classmethod
+    def from_state(cls, state, pack):
+        """Snapshot'tan oda kurar; oyuncular yeniden bağlanana kadar kopuk sayılır.
+        
+        Eski session id'leri anahtar olarak kalır, oyuncu token'ıyla
+        döndüğünde `replace_player_id` ile yenisine taşınır.
+        """
+        room = cls(state['id'], state['name'], state['creator'], state['max_players'], pack=pack,
+                   public=state.get('public', False))
+        room.spy_count = state['spy_count']
+        now = time.time()
+        for pid, public_id, token, name, is_spy, voted in state['players']:
+            player = Player(public_id, token, name)
+            player.is_spy = is_spy
+            player.voted = voted
+            player.connected = False
+            player.disconnect_time = now
+            room.players[pid] = player
+            room.name_index[name.lower()] = pid
+            room.token_index[token] = pid
+        room.game_started = state['started']
+        room.discussion_phase = state['discussion']
+        room.voting_phase = state['voting']
+        room.selected_country = state['word']
+        room.spy_ids = [pid for pid in state['spy_ids'] if pid in room.players]
+        room.spy_player = room.spy_ids[0] if room.spy_ids else None
+        room.phase_deadline = state['deadline']
+        for voter_id, voted_name in state['votes'].items():
+            room.votes[voter_id] = voted_name
+            room._tally(voted_name)
+        room.roster_version = state['roster_version']
+        room.next_public_id = state['next_public_id']
+        room.event_seq = state['seq']
+        room.epoch_seq = state['epoch_seq']
+        return room
+    
+    def roster_snapshot(self):
+        """Oyuncu listesinin tamamı ve sürümü"""
+        return {
+            'version': self.roster_version,
+            'players': [player.to_public() for player in self.players.values()]
+        }
+    
+    def roster_delta(self, added=(), removed=(), changed=()):
+        """Oyuncu listesi değişikliğini yeni sürüm numarasıyla döner.
+        
+        `added`/`changed` player_id, `removed` ise silinmiş oyuncuların public_id listesidir.
+        """
+        self.roster_version += 1
+        return {
+            'version': self.roster_version,
+            'added': [self.players[pid].to_public() for pid in added],
+            'removed': list(removed),
+            'changed': [self.players[pid].to_public() for pid in changed]
+        }
+    
+    def set_connected(self, player_id, connected):
+        """Bağlantı durumunu değiştirir ve sayaçları günceller"""
+        player = self.players[player_id]
+        if player.connected == connected:
+            return
+        player.connected = connected
+        delta = 1 if connected else -1
+        self.connected_count += delta
+        if player.voted:
+            self.voted_count += delta
+    
+    def replace_player_id(self, old_id, new_id):
+        """Yeniden bağlanan oyuncunun kaydını yeni session id'ye taşır"""
+        player = self.players.pop(old_id)
+        self.players[new_id] = player
+        if self.name_index.get(player.name.lower()) == old_id:
+            self.name_index[player.name.lower()] = new_id
+        self.token_index[player.token] = new_id
+        if old_id in self.votes:
+            self.votes[new_id] = self.votes.pop(old_id)
+        if self.creator_id == old_id:
+            self.creator_id = new_id
+        if player.is_spy:
+            self.spy_ids = [new_id if pid == old_id else pid for pid in self.spy_ids]
+            if self.spy_player == old_id:
+                self.spy_player = new_id
     
     def start_game(self):
         # Sadece bağlı oyuncuları say
-        connected_players = [p for p in self.players.values() if p['connected']]
-        connected_player_ids = [pid for pid, p in self.players.items() if p['connected']]
-        
-        if len(connected_players) >= self.spy_count + 2 and not self.game_started:
+        if self.connected_count >= self.spy_count + 2 and not self.game_started:
+            connected_player_ids = [pid for pid, p in self.players.items() if p.connected]
+            
             self.game_started = True
             self.discussion_phase = True
-            self.selected_country = random.choice(COUNTRIES)
+            self.selected_country = self.deck.draw()
             
             # Spy sayısına göre casusları seç
             spy_ids = random.sample(connected_player_ids, self.spy_count)
             
             for player_id in self.players:
                 if player_id in spy_ids:
-                    self.players[player_id]['is_spy'] = True
+                    self.players[player_id].is_spy = True
                 else:
-                    self.players[player_id]['is_spy'] = False
+                    self.players[player_id].is_spy = False
             
             # İlk casusun ID'sini kaydet (geriye uyumluluk için)
             self.spy_player = spy_ids[0]
+            self.spy_ids = spy_ids
+            self.role_info = None
+            update_lobby(self)
             
             return True
         return False
@@ -107,83 +463,90 @@ class SpyGameRoom:
     def add_vote(self, voter_id, voted_player_name):
         """Gizli oylama sistemi - sadece bağlı oyuncular oy verebilir"""
         if (self.voting_phase and voter_id in self.players and 
-            self.players[voter_id]['connected'] and  # Bağlı olmalı
-            not self.players[voter_id]['voted']):
+            self.players[voter_id].connected and  # Bağlı olmalı
+            not self.players[voter_id].voted):
             
             # Oyuncu kendisine oy veremez
-            voter_name = self.players[voter_id]['name']
+            voter_name = self.players[voter_id].name
             if voter_name == voted_player_name:
                 return False
             
             # Oy verilen oyuncunun bağlı olduğunu kontrol et
-            voted_player_connected = False
-            for p in self.players.values():
-                if p['name'] == voted_player_name and p['connected']:
-                    voted_player_connected = True
-                    break
-            
-            if voted_player_connected:
+            voted_player_id = self.find_player(voted_player_name)
+            if voted_player_id is not None and self.players[voted_player_id].connected:
                 self.votes[voter_id] = voted_player_name
-                self.players[voter_id]['voted'] = True
+                self.players[voter_id].voted = True
+                self.voted_count += 1
+                self._tally(voted_player_name)
                 return True
         return False
     
+    def _tally(self, voted_player_name):
+        votes = self.vote_count.get(voted_player_name, 0) + 1
+        self.vote_count[voted_player_name] = votes
+        if votes > self.top_votes:
+            self.top_votes = votes
+            self.leaders = [voted_player_name]
+        elif votes == self.top_votes:
+            self.leaders.append(voted_player_name)
+    
+    def _untally(self, voted_player_name):
+        votes = self.vote_count[voted_player_name] - 1
+        if votes:
+            self.vote_count[voted_player_name] = votes
+        else:
+            del self.vote_count[voted_player_name]
+        # Oy geri alınması nadir; liderleri yeniden hesapla
+        self.top_votes = max(self.vote_count.values(), default=0)
+        self.leaders = [p for p, v in self.vote_count.items() if v == self.top_votes]
+    
+    def all_voted(self):
+        """Bağlı oyuncuların hepsi oy verdi mi"""
+        return self.connected_count > 0 and self.voted_count == self.connected_count
+    
     def check_instant_majority(self):
         """Anlık çoğunluk kontrolü - herkesin oy vermesini beklemeden"""
         if not self.votes:
             return None
             
-        # Bağlı oyuncu sayısı
-        connected_players = [p for p in self.players.values() if p['connected']]
-        total_connected = len(connected_players)
-        
-        # Oy dağılımı
-        vote_count = {}
-        for voted_player in self.votes.values():
-            vote_count[voted_player] = vote_count.get(voted_player, 0) + 1
-        
-        if not vote_count:
-            return None
-            
         # Çoğunluk hesaplaması (yarıdan fazla)
-        majority_threshold = (total_connected // 2) + 1
+        majority_threshold = (self.connected_count // 2) + 1
         
-        for player, votes in vote_count.items():
-            if votes >= majority_threshold:
-                return {
-                    'instant_win': True,
-                    'winner': player,
-                    'vote_count': vote_count,
-                    'total_votes': len(self.votes),
-                    'total_connected': total_connected
-                }
+        if self.top_votes >= majority_threshold:
+            return {
+                'instant_win': True,
+                'winner': self.leaders[0],
+                'vote_count': dict(self.vote_count),
+                'total_votes': len(self.votes),
+                'total_connected': self.connected_count
+            }
         
         return None
     
     def count_votes(self):
         """Oyları sayar ve sonucu döner"""
-        vote_count = {}
-        for voted_player in self.votes.values():
-            vote_count[voted_player] = vote_count.get(voted_player, 0) + 1
-        
-        if not vote_count:
+        if not self.vote_count:
             return None
         
-        max_votes = max(vote_count.values())
-        winners = [player for player, votes in vote_count.items() if votes == max_votes]
-        
         # Eşitlik varsa
-        if len(winners) > 1:
-            return {'tie': True, 'tied_players': winners, 'vote_count': vote_count}
+        if len(self.leaders) > 1:
+            return {'tie': True, 'tied_players': list(self.leaders), 'vote_count': dict(self.vote_count)}
         else:
-            return {'tie': False, 'winner': winners[0], 'vote_count': vote_count}
+            return {'tie': False, 'winner': self.leaders[0], 'vote_count': dict(self.vote_count)}
+    
+    def _clear_votes(self):
+        self.votes = {}
+        self.vote_count = {}
+        self.top_votes = 0
+        self.leaders = []
     
     def reset_voting(self):
         """Eşitlik durumunda oylamayı sıfırlar - sadece bağlı oyuncular için"""
-        self.votes = {}
+        self._clear_votes()
         for player_id in self.players:
-            if self.players[player_id]['connected']:  # Sadece bağlı oyuncuları reset et
-                self.players[player_id]['voted'] = False
+            if self.players[player_id].connected:  # Sadece bağlı oyuncuları reset et
+                self.players[player_id].voted = False
+        self.voted_count = 0
     
     def reset_game(self):
         """Oyunu yeniden başlatmak için sıfırlar"""
@@ -192,197 +555,551 @@ class SpyGameRoom:
         self.voting_phase = False
         self.selected_country = None
         self.spy_player = None
-        self.votes = {}
-        self.discussion_timer = None
-        self.voting_timer = None
+        self.spy_ids = []
+        self.role_info = None
+        self.phase_deadline = None
+        self._clear_votes()
         
         # Oyuncuları sıfırla (ama odada tut)
         for player_id in self.players:
-            self.players[player_id]['is_spy'] = False
-            self.players[player_id]['voted'] = False
+            self.players[player_id].is_spy = False
+            self.players[player_id].voted = False
+        self.voted_count = 0
+        update_lobby(self)
         
         return True
     
+    def role_payloads(self):
+        """(casus, vatandaş) rol mesajları; oyun başına bir kez oluşturulur"""
+        if self.role_info is None:
+            spy_count = len(self.spy_ids)
+            meta = self.deck.pack.meta
+            self.role_info = ({
+                'role': 'spy',
+                'message': f'🕵️ Sen CASUSSUN! Toplam {spy_count} casus var. {meta.get("spy_hint", "Kelimeyi tahmin etmeye çalış.")}',
+                'country': None,
+                'label': meta.get('label', 'Kelime'),
+                'spy_count': spy_count
+            }, {
+                'role': 'citizen',
+                'message': f'🌍 {meta.get("citizen", "Kelimen")}: {self.selected_country}',
+                'country': self.selected_country,
+                'label': meta.get('label', 'Kelime'),
+                'spy_count': self.spy_count
+            })
+        return self.role_info
+    
+    def spy_names(self):
+        return [self.players[pid].name for pid in self.spy_ids if pid in self.players]
+    
     def get_player_info(self, player_id):
         if player_id in self.players:
-            player = self.players[player_id]
-            if player['is_spy']:
-                # Casus sayısı bilgisini ver
-                spy_count = sum(1 for p in self.players.values() if p['is_spy'])
-                return {
-                    'role': 'spy',
-                    'message': f'🕵️ Sen CASUSSUN! Toplam {spy_count} casus var. Ülkeyi tahmin etmeye çalış.',
-                    'country': None,
-                    'spy_count': spy_count
-                }
-            else:
-                return {
-                    'role': 'citizen',
-                    'message': f'🌍 Ülken: {self.selected_country}',
-                    'country': self.selected_country,
-                    'spy_count': self.spy_count
-                }
+            spy_info, citizen_info = self.role_payloads()
+            return spy_info if self.players[player_id].is_spy else citizen_info
         return None
 
-def generate_room_id():
-    """4 karakterli kısa oda kodu üret"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
+def owns_room(room_id):
+    """Oda bu worker'a mı ait"""
+    return room_owner(room_id, app.config['WORKER_COUNT']) == app.config['WORKER_INDEX']
+
+# 4 karakterli oda kodları; sadece bu worker'a düşen kodlar dağıtılır
+room_codes = RoomCodeAllocator(length=4, accept=owns_room,
+                               capacity=36 ** 4 // app.config['WORKER_COUNT'])
+
+def delete_room(room_id):
+    """Odayı siler ve kodunu yeniden kullanılmak üzere geri verir"""
+    room = game_rooms.pop(room_id, None)
+    if room is None:
+        return
+    scheduler.cancel(('phase', room_id))
+    scheduler.cancel(('chat', room_id))
+    if lobby.discard(room_id):
+        schedule_lobby_update()
+    for player_id in room.players:
+        scheduler.cancel(('remove_player', player_id))
+        if player_rooms.get(player_id) == room_id:
+            del player_rooms[player_id]
+    socketio.close_room(room_id)
+    room_codes.release(room_id)
+    log.info('room deleted', extra=logs.fields(room_id=room_id, codes_in_use=room_codes.in_use))
+
+def update_lobby(room):
+    """Odanın lobideki yerini günceller; değiştiyse abonelere güncelleme planlar"""
+    joinable = (app.config['LOBBY_ENABLED'] and room.public and not room.game_started and len(room.players) < room.max_players
+                and game_rooms.get(room.room_id) is room)
+    if lobby.update(room.room_id, joinable, len(room.players)):
+        schedule_lobby_update()
+
+def schedule_lobby_update():
+    """Aboneleri en fazla LOBBY_UPDATE_INTERVAL'da bir günceller (arada olanlar birleşir)"""
+    global lobby_pending
+    if lobby_pending or not lobby_subscribers:
+        return
+    lobby_pending = True
+    scheduler.schedule(('lobby',), app.config['LOBBY_UPDATE_INTERVAL'], flush_lobby)
+
+def lobby_page(page):
+    page_size = app.config['LOBBY_PAGE_SIZE']
+    room_ids, total = lobby.page(page * page_size, page_size)
+    rooms = [game_rooms[room_id].to_lobby() for room_id in room_ids if room_id in game_rooms]
+    return {'page': page, 'page_size': page_size, 'total': total, 'rooms': rooms}
+
+def flush_lobby():
+    """Her sayfayı bir kez kurup kodlar ve o sayfayı izleyen abonelere gönderir"""
+    global lobby_pending
+    lobby_pending = False
+    pages = {}
+    for sid, page in list(lobby_subscribers.items()):
+        pages.setdefault(page, []).append(sid)
+    for page, sids in pages.items():
+        emit_encoded('lobby_update', lobby_page(page), sids)
+
+def sweep_idle_rooms():
+    """ROOM_IDLE_TTL boyunca olay olmayan odaları siler ve kendini yeniden planlar"""
+    deadline = time.monotonic() - app.config['ROOM_IDLE_TTL']
+    for room_id, room in list(game_rooms.items()):
+        if room.last_activity < deadline:
+            run_in_room(room_id, close_idle_room, room_id, deadline)
+    scheduler.schedule(('room_gc',), app.config['ROOM_GC_INTERVAL'], sweep_idle_rooms)
+
+def close_idle_room(room_id, deadline):
+    room = game_rooms.get(room_id)
+    if room is not None and room.last_activity < deadline:
+        emit_to_room(room, 'room_closed', {'message': 'Oda uzun süre kullanılmadığı için kapatıldı.'})
+        delete_room(room_id)
+
+scheduler.schedule(('room_gc',), app.config['ROOM_GC_INTERVAL'], sweep_idle_rooms)
+
+def room_event(f):
+    """Socket handler'ını ilgili odanın aktörü üzerinden çalıştırır.
+    
+    Aynı odanın olayları sırayla, farklı odalarınkiler paralel işlenir. Oda
+    `room_id` alanından, yoksa oyuncunun session id'sinden bulunur.
+    """
+    @functools.wraps(f)
+    def wrapper(*args):
+        data = args[0] if args and isinstance(args[0], dict) else {}
+        room_id = data.get('room_id') or player_rooms.get(request.sid)
+        room = game_rooms.get(str(room_id).upper()) if room_id else None
+        if room is None and room_id and standby and take_over():
+            # Kapanan eski process odaları az önce devretti
+            room = game_rooms.get(str(room_id).upper())
+        if room is None:
+            return f(*args)
+        room.actor.submit(f, *args)
+    return wrapper
+
+def rate_limited(event):
+    """Bağlantının olay hızını sınırlar; sınırı aşan olay handler'a ve oda aktörüne ulaşmaz"""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args):
+            allowed, retry_after = limiter.allow(request.sid, event)
+            if allowed:
+                return f(*args)
+            metrics.registry.record_drop(event, 'rate')
+            if retry_after is not None:
+                # Sıkışma başına tek bildirim
+                emit('rate_limited', {'event': event, 'retry_after': round(retry_after, 1)})
+        return wrapper
+    return decorator
+
+def run_in_room(room_id, fn, *args):
+    """Arka plan işini (zamanlayıcı vb.) odanın aktörü üzerinden çalıştırır"""
+    room = game_rooms.get(room_id)
+    if room is None:
+        return fn(*args)
+    room.actor.submit(fn, *args)
+
+def wire_codec():
+    """Sayfanın kullanacağı kodlama; `?wire=json|msgpack` ile değiştirilebilir"""
+    name = request.args.get('wire', app.config['WIRE_CODEC'])
+    return 'msgpack' if name == 'msgpack' and msgpack_supported else 'json'
+
+def asset_url(filename):
+    """Şablonlarda statik dosya adresi: özetli ad, boru hattı kapalıysa /static"""
+    if assets is not None and filename in assets:
+        return url_for('asset', filename=assets.urls[filename])
+    return url_for('static', filename=filename)
+
+@app.context_processor
+def template_helpers():
+    return {'asset_url': asset_url}
+
+@app.route('/assets/<path:filename>')
+def asset(filename):
+    found, current = assets.get(filename) if assets is not None else (None, False)
+    if found is None:
+        abort(404)
+    # Eski sürümün özetiyle gelen istek güncel içeriği alır ama önbelleğe almaz
+    return found.response(request, IMMUTABLE if current else 'no-cache')
+
+def cached_page(key, render):
+    """Sayfayı PAGE_CACHE_TTL boyunca işlenmiş ve sıkıştırılmış hâlinden sunar"""
+    page = page_cache.get(key, lambda: Asset(render().encode('utf-8'), CONTENT_TYPES['.html']))
+    # Tarayıcı her seferinde ETag ile sorar; değişmediyse 304 döner
+    return page.response(request, 'no-cache')
 
 @app.route('/')
 def index():
-    return render_template('index.html')
+    codec = wire_codec()
+    return cached_page(('index', codec), lambda: render_template(
+        'index.html', worker_count=app.config['WORKER_COUNT'], wire_codec=codec,
+        lobby_enabled=app.config['LOBBY_ENABLED'],
+        word_packs=word_packs.catalog(), default_pack=app.config['DEFAULT_WORD_PACK']))
+
+@app.route('/lobby')
+def lobby_list():
+    if not app.config['LOBBY_ENABLED']:
+        return jsonify({'error': 'Lobi kapalı'}), 404
+    return jsonify(lobby_page(max(request.args.get('page', 0, type=int), 0)))
+
+@app.route('/stats')
+def stats():
+    return jsonify({
+        'rooms': len(game_rooms),
+        'room_codes': room_codes.stats()
+    })
+
+def cached_stats(key, compute):
+    if history is None:
+        return jsonify({'error': 'Oyun geçmişi kapalı'}), 404
+    response = jsonify(stats_cache.get(key, compute))
+    response.cache_control.public = True
+    response.cache_control.max_age = int(app.config['STATS_CACHE_TTL'])
+    return response
+
+@app.route('/stats/leaderboard')
+def stats_leaderboard():
+    limit = min(request.args.get('limit', 20, type=int), 100)
+    min_games = max(request.args.get('min_games', 1, type=int), 1)
+    return cached_stats(('leaderboard', limit, min_games),
+                        lambda: {'players': history.leaderboard(limit, min_games)})
+
+@app.route('/stats/players/<name>')
+def stats_player(name):
+    return cached_stats(('player', name.lower()), lambda: history.player_stats(name))
+
+@app.route('/stats/rooms/<room_id>')
+def stats_room(room_id):
+    return cached_stats(('room', room_id), lambda: history.room_stats(room_id))
+
+def record_slow_event(event, elapsed, args):
+    """SLOW_EVENT_MS'i aşan handler çağrısını oda büyüklüğüyle kaydeder"""
+    data = args[0] if args and isinstance(args[0], dict) else {}
+    room_id = data.get('room_id') or player_rooms.get(request.sid)
+    room = game_rooms.get(str(room_id).upper()) if room_id else None
+    entry = {
+        'event': event,
+        'ms': round(elapsed * 1000, 1),
+        'room_id': room.room_id if room else None,
+        'players': len(room.players) if room else None,
+        'ts': round(time.time(), 3)
+    }
+    slow_events.append(entry)
+    log.warning('slow event', extra=logs.fields(**entry))
+
+if app.config['SLOW_EVENT_MS'] > 0:
+    metrics.registry.on_slow = record_slow_event
+    metrics.registry.slow_threshold = app.config['SLOW_EVENT_MS'] / 1000
+
+def require_admin():
+    """ADMIN_TOKEN tanımlı değilse 404, `Authorization: Bearer <anahtar>` tutmazsa 403"""
+    token = app.config['ADMIN_TOKEN']
+    if not token:
+        abort(404)
+    given = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    if not secrets.compare_digest(given.encode('utf-8'), token.encode('utf-8')):
+        abort(403)
+
+@app.route('/admin/profile', methods=['POST'])
+def admin_profile():
+    """`seconds` boyunca örnekler ve yığınları flamegraph'ın collapsed biçiminde döner"""
+    require_admin()
+    seconds = min(max(request.args.get('seconds', 10, type=float), 0.1), app.config['PROFILE_MAX_SECONDS'])
+    if not profiler.start(seconds, include_idle=request.args.get('idle') == '1'):
+        return jsonify({'error': 'Profiler zaten çalışıyor'}), 409
+    log.info('profiler started', extra=logs.fields(seconds=seconds))
+    while profiler.running:
+        socketio.sleep(0.1)
+    response = Response(profiler.collapsed(), mimetype='text/plain')
+    response.headers['X-Profile-Samples'] = str(profiler.sample_count)
+    return response
+
+@app.route('/admin/profile', methods=['DELETE'])
+def admin_profile_stop():
+    """Çalışan örneklemeyi erken bitirir (bekleyen POST sonucu hemen döner)"""
+    require_admin()
+    profiler.stop()
+    return '', 204
+
+@app.route('/admin/slow')
+def admin_slow():
+    require_admin()
+    return jsonify({'threshold_ms': app.config['SLOW_EVENT_MS'], 'events': list(slow_events)})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+def _count_players(connected):
+    rooms = list(game_rooms.values())
+    if connected:
+        return sum(room.connected_count for room in rooms)
+    return sum(len(room.players) - room.connected_count for room in rooms)
+
+metrics.gauge('spy_rooms', 'Live game rooms.', lambda: len(game_rooms))
+metrics.gauge('spy_lobby_rooms', 'Public rooms listed in the lobby.', lambda: len(lobby))
+metrics.gauge('spy_lobby_subscribers', 'Connections watching the lobby.', lambda: len(lobby_subscribers))
+metrics.gauge('spy_players_connected', 'Connected players in all rooms.', lambda: _count_players(True))
+metrics.gauge('spy_players_disconnected', 'Disconnected players waiting to reconnect or be removed.',
+              lambda: _count_players(False))
+metrics.gauge('spy_players_background', 'Connected players whose tab is in the background.',
+              lambda: sum(p.connected and p.background for room in list(game_rooms.values())
+                          for p in list(room.players.values())))
+metrics.gauge('spy_reaper_timers_pending', 'Pending delayed player removals.',
+              lambda: scheduler.pending('remove_player'))
+metrics.gauge('spy_phase_timers_pending', 'Rooms with a running discussion or voting deadline.',
+              lambda: scheduler.pending('phase'))
+metrics.gauge('spy_scheduler_timers_pending', 'All pending scheduler timers.', lambda: scheduler.pending())
+metrics.gauge('spy_history_queue_depth', 'Finished games waiting to be written to the history database.',
+              lambda: history.pending() if history else 0)
+metrics.gauge('spy_history_dropped', 'Finished games dropped because the history queue was full or a write failed.',
+              lambda: history.dropped if history else 0)
+metrics.gauge('spy_log_records_dropped', 'Log records dropped because the log queue was full.', logs.dropped)
+metrics.gauge('spy_room_code_occupancy', 'Fraction of this worker\'s room-code space in use.',
+              lambda: room_codes.stats()['occupancy'])
 
 @app.route('/game/<room_id>')
 def game(room_id):
-    return render_template('game.html', room_id=room_id)
+    codec = wire_codec()
+    return cached_page(('game', room_id, codec), lambda: render_template(
+        'game.html', room_id=room_id, worker_index=room_owner(room_id, app.config['WORKER_COUNT']),
+        wire_codec=codec))
+
+def emit_encoded(event, payload, sids):
+    """payload'ı bir kez kodlayıp verilen oyunculara gönderir"""
+    if not sids:
+        return
+    packets = fanout.encode(socketio.server, event, payload)
+    for sid in fanout.send(socketio.server, packets, sids):
+        # Bağlantısı bu process'te olmayan oyuncu: message queue üzerinden gönder
+        socketio.emit(event, payload, room=sid)
+
+def emit_to_room(room, event, payload):
+    """Odadaki bağlantılara tek kodlamayla yayın yapar"""
+    emit_encoded(event, payload, fanout.room_sids(socketio.server, room.room_id))
+
+def emit_room_event(room, event, payload):
+    """Oda olayını kaydedip yayınlar (yeniden bağlananlara tekrar gönderilebilsin diye)"""
+    room.last_activity = time.monotonic()
+    emit_to_room(room, event, room.log_event(event, payload))
+
+def emit_roster_update(event, room, delta, **fields):
+    """Oyuncu listesi değişikliğini odaya delta olarak yayınlar"""
+    room.last_activity = time.monotonic()
+    payload = {'roster': delta, 'player_count': len(room.players)}
+    payload.update(fields)
+    emit_to_room(room, event, payload)
 
 @socketio.on('create_room')
+@rate_limited('create_room')
+@metrics.instrument('create_room')
 def handle_create_room(data):
-    room_name = data.get('room_name', 'Oda')
+    room_name = data.get('room_name')
+    # Oda adı lobide herkese gösterilir
+    room_name = room_name.strip()[:40] if isinstance(room_name, str) and room_name.strip() else 'Oda'
     player_name = data.get('player_name', 'Oyuncu')
     spy_count = data.get('spy_count', 1)  # Hain sayısı
+    pack_name = data.get('pack') or app.config['DEFAULT_WORD_PACK']
+    
+    if draining or standby:
+        emit('create_error', {'message': 'Sunucu yeniden başlatılıyor, birazdan tekrar deneyin.'})
+        return
     
-    # Yeni oda ID'si oluştur
-    room_id = generate_room_id()
+    if not isinstance(pack_name, str) or pack_name not in word_packs:
+        emit('create_error', {'message': 'Kelime paketi bulunamadı!'})
+        return
     
-    # Aynı ID yoksa emin ol
-    while room_id in game_rooms:
-        room_id = generate_room_id()
+    # Boştaki oda kodlarından birini al
+    try:
+        room_id = room_codes.allocate()
+    except IndexError:
+        emit('create_error', {'message': 'Sunucu dolu, daha sonra tekrar deneyin!'})
+        return
     
     # Yeni oda oluştur
     player_id = request.sid
-    game_rooms[room_id] = SpyGameRoom(room_id, room_name, player_id)
+    game_rooms[room_id] = SpyGameRoom(room_id, room_name, player_id, pack=word_packs.get(pack_name),
+                                      public=data.get('public') is True)
     game_rooms[room_id].spy_count = spy_count
     
     # Oyuncuyu odaya ekle
-    if game_rooms[room_id].add_player(player_id, player_name):
+    room = game_rooms[room_id]
+    if room.add_player(player_id, player_name):
+        player_rooms[player_id] = room_id
         join_room(room_id)
-        emit('room_created', {
-            'room_id': room_id,
-            'room_name': room_name,
-            'player_name': player_name,
-            'is_creator': True,
-            'spy_count': spy_count
-        })
-        emit('player_joined', {
-            'players': list(game_rooms[room_id].players.values()),
-            'player_count': len(game_rooms[room_id].players),
-            'new_player_name': player_name
-        }, room=room_id)
+        emit('room_created', dict(room.to_public(),
+                                  player_name=player_name,
+                                  is_creator=True,
+                                  resume_token=room.players[player_id].token,
+                                  server_time=int(time.time() * 1000)))
+        emit_roster_update('player_joined', room, room.roster_delta(added=[player_id]),
+                           new_player_name=player_name)
     else:
+        delete_room(room_id)
         emit('create_error', {'message': 'Oda oluşturma hatası!'})
 
 @socketio.on('heartbeat')
-def handle_heartbeat(data):
-    """Heartbeat from client to keep connection alive"""
-    room_id = data.get('roomId')
-    player_name = data.get('playerName')
-    is_background = data.get('background', False)
-    
-    # Heartbeat'e response ver
-    emit('heartbeat_response', {
-        'timestamp': time.time(),
-        'status': 'alive'
-    })
+@rate_limited('heartbeat')
+@metrics.instrument('heartbeat')
+def handle_heartbeat(data=None):
+    """İstemcinin seyrek canlılık sinyali; sekmenin durumunu kaydeder.
     
-    # Debug - background mode'da daha az log
-    if not is_background:
-        print(f"DEBUG: Heartbeat received from {player_name} in room {room_id}")
-    
-    # Oyuncunun bağlantı durumunu güncelle
-    if room_id in game_rooms:
-        room = game_rooms[room_id]
-        player_id = request.sid
-        if player_id in room.players:
-            room.players[player_id]['connected'] = True
-            room.players[player_id]['last_heartbeat'] = time.time()
+    Oda aktörüne uğramaz, yalnızca iki alan yazılır. Yanıt sadece istemci
+    ack isterse gider: bu sekme durumu için heartbeat aralığı (saniye).
+    """
+    background = bool(data.get('background')) if isinstance(data, dict) else False
+    player_id = request.sid
+    room = game_rooms.get(player_rooms.get(player_id))
+    player = room.players.get(player_id) if room is not None else None
+    if player is not None:
+        player.last_heartbeat = time.time()
+        player.background = background
+        if logs.sampled('heartbeat'):
+            log.debug('heartbeat', extra=logs.fields(room_id=room.room_id, player=player.name,
+                                                     background=background))
+        if not player.connected:
+            # Tarama bayat saymıştı ama istemci hâlâ orada
+            run_in_room(room.room_id, revive_player, room.room_id, player_id)
+    return {'interval': liveness.interval(background)}
+
+def revive_player(room_id, player_id):
+    room = game_rooms.get(room_id)
+    if room is None or player_id not in room.players or room.players[player_id].connected:
+        return
+    scheduler.cancel(('remove_player', player_id))
+    room.set_connected(player_id, True)
+    emit_roster_update('player_joined', room, room.roster_delta(changed=[player_id]))
 
 @socketio.on('join_room')
+@rate_limited('join_room')
+@room_event
+@metrics.instrument('join_room')
 def handle_join_room(data):
     room_id = data.get('room_id', '').upper()
     player_name = data.get('player_name', 'Oyuncu')
     player_id = request.sid
     is_reconnect = data.get('reconnect', False)
-    game_state = data.get('game_state', {})
+    resume_token = data.get('resume_token')
+    if not isinstance(resume_token, str):
+        resume_token = None  # liste/sözlük gibi değerler token sayılmaz
+    last_seq = data.get('last_seq', 0)
     
-    print(f"DEBUG: Join room attempt - Room ID: {room_id}, Player: {player_name}, Reconnect: {is_reconnect}")
-    print(f"DEBUG: Available rooms: {list(game_rooms.keys())}")
+    log.debug('join attempt', extra=logs.fields(room_id=room_id, player=player_name,
+                                                reconnect=is_reconnect))
+    
+    if not owns_room(room_id):
+        # Oda başka bir worker'da - istemci oyun sayfasından doğru worker'a bağlanır
+        emit('room_redirect', {'room_id': room_id, 'player_name': player_name})
+        return
+    
+    if draining or (standby and not take_over()):
+        # Bu process kapanıyor ya da eski process odaları henüz devretmedi; istemci biraz sonra tekrar bağlanır
+        emit('server_restart', {'message': RESTART_MESSAGE})
+        return
     
     if room_id in game_rooms:
         room = game_rooms[room_id]
         
-        # Reconnection case - aynı isimde disconnected oyuncu var mı?
-        existing_player_id = None
-        if is_reconnect:
-            for pid, player in room.players.items():
-                if player['name'] == player_name:
-                    existing_player_id = pid
-                    break
+        # Reconnection case - token ile kimlik geri yükleme
+        existing_player_id = room.token_index.get(resume_token) if resume_token else None
         
         if existing_player_id:
+            # Bekleyen silme işlemini iptal et
+            scheduler.cancel(('remove_player', existing_player_id))
+            
             # Mevcut oyuncuyu yeniden bağla
-            room.players[existing_player_id]['connected'] = True
-            room.players[existing_player_id]['last_heartbeat'] = time.time()
+            room.set_connected(existing_player_id, True)
+            room.players[existing_player_id].last_heartbeat = time.time()
             
             # Eski player_id'yi yeni session ile değiştir 
-            room.players[player_id] = room.players.pop(existing_player_id)
+            room.replace_player_id(existing_player_id, player_id)
+            if player_rooms.get(existing_player_id) == room_id:
+                del player_rooms[existing_player_id]
+            player_rooms[player_id] = room_id
+            player_name = room.players[player_id].name
             
             join_room(room_id)
-            emit('room_joined', {
-                'room_id': room_id,
-                'room_name': room.room_name,
-                'player_name': player_name,
-                'is_creator': (player_id == room.creator_id)
-            })
+            emit('room_joined', dict(room.to_public(),
+                                     player_name=player_name,
+                                     is_creator=(player_id == room.creator_id),
+                                     resume_token=resume_token,
+                                     server_time=int(time.time() * 1000)))
             
-            print(f"DEBUG: {player_name} reconnected to room {room_id}")
+            log.info('player reconnected', extra=logs.fields(room_id=room_id, player=player_name))
             
-            # Oyun durumunu gönder
-            if room.game_started:
-                player_info = room.get_player_info(player_id)
-                if player_info:
-                    emit('role_assigned', player_info)
-                    emit('game_started', {
-                        'message': f'Oyuna yeniden katıldınız! {room.spy_count} hain var.',
-                        'phase': 'discussion' if room.discussion_phase else 'voting',
+            # Sadece kaçırılan olayları gönder
+            missed_events = room.events_since(last_seq)
+            if missed_events is not None:
+                missed_start = False
+                for seq, event, payload in missed_events:
+                    emit(event, payload)
+                    if event == 'game_started':
+                        missed_start = True
+                if room.game_started and (missed_start or not data.get('has_role', False)):
+                    emit('role_assigned', room.get_player_info(player_id))
+            elif room.game_started:
+                # Kayıt tamponu yetmedi - oyun durumunun tamamını gönder
+                emit('role_assigned', room.get_player_info(player_id))
+                emit('game_started', {
+                    'message': f'Oyuna yeniden katıldınız! {room.spy_count} hain var.',
+                    'phase': 'discussion' if room.discussion_phase else 'voting',
+                    'timer': 0,
+                    'deadline': room.phase_deadline,
+                    'spy_count': room.spy_count,
+                    'seq': room.event_seq
+                })
+                if room.voting_phase:
+                    emit('voting_started', {
+                        'message': '🗳️ Oylama devam ediyor.',
+                        'players': [{'name': p.name} for p in room.players.values() if p.connected],
+                        'phase': 'voting',
                         'timer': 0,
-                        'spy_count': room.spy_count
+                        'deadline': room.phase_deadline,
+                        'seq': room.event_seq
                     })
             
             # Her durumda oyuncu listesini güncelle
-            emit('player_joined', {
-                'players': list(room.players.values()),
-                'player_count': len(room.players)
-            }, room=room_id)
+            delta = room.roster_delta(changed=[player_id])
+            emit('roster_snapshot', room.roster_snapshot())
+            emit_roster_update('player_joined', room, delta)
             
         elif room.add_player(player_id, player_name):
-            # Yeni oyuncu ekle
-            room.players[player_id]['last_heartbeat'] = time.time()
+            # Yeni oyuncu eklendi
+            player_rooms[player_id] = room_id
             
             join_room(room_id)
-            emit('room_joined', {
-                'room_id': room_id,
-                'room_name': room.room_name,
-                'player_name': player_name,
-                'is_creator': (player_id == room.creator_id)
-            })
+            emit('room_joined', dict(room.to_public(),
+                                     player_name=player_name,
+                                     is_creator=(player_id == room.creator_id),
+                                     resume_token=room.players[player_id].token,
+                                     server_time=int(time.time() * 1000)))
             
             # Yeni oyuncu eklendi mesajı için
-            emit('player_joined', {
-                'players': list(room.players.values()),
-                'player_count': len(room.players),
-                'new_player_name': player_name
-            }, room=room_id)
+            delta = room.roster_delta(added=[player_id])
+            emit('roster_snapshot', room.roster_snapshot())
+            emit_roster_update('player_joined', room, delta, new_player_name=player_name)
         else:
             # Hata nedeni belirleme
             if len(room.players) >= room.max_players:
-                emit('join_error', {'message': 'Oda dolu! Maksimum 8 oyuncu olabilir.'})
+                emit('join_error', {'message': f'Oda dolu! Maksimum {room.max_players} oyuncu olabilir.'})
             elif room.game_started:
                 emit('join_error', {'message': 'Oyun zaten başlamış!'})
             else:
                 # Aynı isimde bağlı oyuncu var kontrolü
-                existing_names = [p['name'].lower() for p in room.players.values() if p['connected']]
-                if player_name.lower() in existing_names:
+                existing_id = room.name_index.get(player_name.lower())
+                if existing_id is not None and room.players[existing_id].connected:
                     emit('join_error', {'message': f'"{player_name}" ismi zaten kullanılıyor! Başka bir isim deneyin.'})
                 else:
                     emit('join_error', {'message': 'Odaya katılma hatası!'})
@@ -391,6 +1108,9 @@ def handle_join_room(data):
         emit('join_error', {'message': 'Oda bulunamadı!'})
 
 @socketio.on('start_game')
+@rate_limited('start_game')
+@room_event
+@metrics.instrument('start_game')
 def handle_start_game(data):
     room_id = data.get('room_id')
     player_id = request.sid
@@ -404,49 +1124,114 @@ def handle_start_game(data):
             return
         
         # Bağlı oyuncu sayısını kontrol et
-        connected_players = [p for p in room.players.values() if p['connected']]
         min_players = room.spy_count + 2  # En az spy_count + 2 oyuncu gerekli
         
-        print(f"DEBUG: Start game request. Connected players: {len(connected_players)}, Required: {min_players}")
+        log.debug('start game', extra=logs.fields(room_id=room_id, connected=room.connected_count,
+                                                  required=min_players))
         
-        if len(connected_players) >= min_players and room.start_game():
-            # Oyun başlatıldığında direkt oylama moduna geç
-            room.voting_phase = True
+        if room.connected_count >= min_players and room.start_game():
+            # Tartışma fazı: süre dolunca oylama otomatik başlar
+            seconds = app.config['DISCUSSION_SECONDS']
+            deadline = schedule_phase(room, seconds)
             
             # Tüm oyunculara oyun başladığını bildir
-            emit('game_started', {
-                'message': f'Oyun başladı! {room.spy_count} hain var. Oylama açık - istediğiniz zaman oy verebilirsiniz.',
-                'phase': 'voting',
-                'timer': 0,
+            emit_room_event(room, 'game_started', {
+                'message': f'Oyun başladı! {room.spy_count} hain var. Tartışma süresi {seconds // 60}:{seconds % 60:02d} - '
+                           f'isterseniz oylamayı erken başlatabilirsiniz.',
+                'phase': 'discussion',
+                'timer': seconds,
+                'deadline': deadline,
                 'spy_count': room.spy_count
-            }, room=room_id)
+            })
             
-            # Sadece bağlı oyunculara rollerini gönder
+            # Sadece bağlı oyunculara rollerini gönder - iki mesaj, her biri bir kez kodlanır
+            spy_info, citizen_info = room.role_payloads()
+            spies, citizens = [], []
             for pid, player in room.players.items():
-                if player['connected']:
-                    player_info = room.get_player_info(pid)
-                    socketio.emit('role_assigned', player_info, room=pid)
+                if player.connected:
+                    (spies if player.is_spy else citizens).append(pid)
+            emit_encoded('role_assigned', spy_info, spies)
+            emit_encoded('role_assigned', citizen_info, citizens)
+        else:
+            emit('start_error', {'message': f'Oyunu başlatmak için en az {min_players} bağlı oyuncu gerekli! Şu anda bağlı: {room.connected_count}'})
+
+def schedule_phase(room, seconds):
+    """Aktif fazın bitişini ortak zamanlayıcıya kaydeder, istemcilere gönderilecek
+    mutlak bitiş zamanını (epoch ms) döner"""
+    deadline = int((time.time() + seconds) * 1000)
+    room.phase_deadline = deadline
+    scheduler.schedule(('phase', room.room_id), seconds,
+                       run_in_room, room.room_id, phase_timeout, room.room_id, deadline)
+    return deadline
+
+def cancel_phase(room):
+    room.phase_deadline = None
+    scheduler.cancel(('phase', room.room_id))
+
+def phase_timeout(room_id, deadline):
+    """Faz süresi doldu: tartışmadan oylamaya, oylamadan sonuca geçer"""
+    room = game_rooms.get(room_id)
+    if room is None or room.phase_deadline != deadline:
+        return  # faz bu arada değişti
+    room.phase_deadline = None
+    if room.discussion_phase:
+        begin_voting(room, '⏰ Tartışma süresi doldu! Oylama başladı.')
+    elif room.voting_phase:
+        if room.vote_count:
+            handle_vote_results(room_id)
         else:
-            emit('start_error', {'message': f'Oyunu başlatmak için en az {min_players} bağlı oyuncu gerekli! Şu anda bağlı: {len(connected_players)}'})
+            # Kimse oy vermedi - casuslar kazanır
+            handle_game_end(room_id, {'winner': None, 'vote_count': {}})
+
+def begin_voting(room, message):
+    room.discussion_phase = False
+    room.voting_phase = True
+    seconds = app.config['VOTING_SECONDS']
+    deadline = schedule_phase(room, seconds)
+    emit_room_event(room, 'voting_started', {
+        'message': message,
+        'players': [{'name': p.name} for p in room.players.values() if p.connected],
+        'phase': 'voting',
+        'timer': seconds,
+        'deadline': deadline
+    })
+
+@socketio.on('start_voting')
+@rate_limited('start_voting')
+@room_event
+@metrics.instrument('start_voting')
+def handle_start_voting(data):
+    """Oyunculardan biri tartışma süresi dolmadan oylamayı başlatır"""
+    player_id = request.sid
+    room_id = data.get('room_id') or player_rooms.get(player_id)
+    room = game_rooms.get(room_id)
+    
+    if room is not None and player_id in room.players and room.discussion_phase:
+        begin_voting(room, f'🗳️ {room.players[player_id].name} oylamayı başlattı!')
 
 @socketio.on('submit_vote')
+@rate_limited('submit_vote')
+@room_event
+@metrics.instrument('submit_vote')
 def handle_submit_vote(data):
-    room_id = data.get('room_id')
-    voted_player = data.get('voted_player')
     voter_id = request.sid
+    room_id = data.get('room_id') or player_rooms.get(voter_id)
+    voted_player = data.get('voted_player')
+    if not isinstance(voted_player, str):
+        return
     
     if room_id in game_rooms:
         room = game_rooms[room_id]
         
         # Oyuncu kendisine oy veriyor mu kontrol et
-        if voter_id in room.players and room.players[voter_id]['name'] == voted_player:
+        if voter_id in room.players and room.players[voter_id].name == voted_player:
             return  # Kendine oy verme engellenmiş
         
         if room.add_vote(voter_id, voted_player):
-            voter_name = room.players[voter_id]['name']
-            emit('vote_submitted', {
+            voter_name = room.players[voter_id].name
+            emit_room_event(room, 'vote_submitted', {
                 'message': f'{voter_name} oyunu kullandı.'
-            }, room=room_id)
+            })
             
             # Anlık çoğunluk kontrolü
             instant_result = room.check_instant_majority()
@@ -456,12 +1241,11 @@ def handle_submit_vote(data):
                 return
             
             # Sadece bağlı oyuncuların hepsi oy verdiyse final sonuçları hesapla
-            connected_players = [pid for pid, p in room.players.items() if p['connected']]
-            connected_voted = [pid for pid in connected_players if room.players[pid]['voted']]
+            if logs.sampled('submit_vote'):
+                log.info('vote', extra=logs.fields(room_id=room_id, connected=room.connected_count,
+                                                   voted=room.voted_count))
             
-            print(f"DEBUG: Connected players: {len(connected_players)}, Voted: {len(connected_voted)}")
-            
-            if len(connected_voted) == len(connected_players) and len(connected_players) > 0:
+            if room.all_voted():
                 handle_vote_results(room_id)
 
 def handle_game_end(room_id, result):
@@ -469,35 +1253,72 @@ def handle_game_end(room_id, result):
     if room_id in game_rooms:
         room = game_rooms[room_id]
         
+        # Oylama kapandı, bekleyen faz süresi iptal
+        cancel_phase(room)
+        room.discussion_phase = False
+        room.voting_phase = False
+        
         winner = result['winner']
         
         # Tüm casusları bul
-        spy_players = [p['name'] for p in room.players.values() if p['is_spy']]
+        spy_players = room.spy_names()
         spy_names = ', '.join(spy_players)
         
+        if winner is None:
+            # Süre doldu, hiç oy verilmedi
+            emit_room_event(room, 'game_ended', {
+                'result': 'spy_wins',
+                'message': f'⏰ Süre doldu ve kimse oy vermedi! Casuslar kazandı: {spy_names}',
+                'voted_player': None,
+                'spy_player': spy_names,
+                'spy_players': spy_players,
+                'country': room.selected_country,
+                'label': room.deck.pack.meta.get('label', 'Kelime'),
+                'vote_count': result['vote_count']
+            })
         # Casuslardan herhangi biri yakalandı mı?
-        if winner in spy_players:
+        elif winner in spy_players:
             # Casus yakalandı
-            emit('game_ended', {
+            emit_room_event(room, 'game_ended', {
                 'result': 'citizens_win',
                 'message': f'🎉 Vatandaşlar kazandı! Casus {winner} yakalandı!',
                 'voted_player': winner,
                 'spy_player': spy_names,
                 'spy_players': spy_players,
                 'country': room.selected_country,
+                'label': room.deck.pack.meta.get('label', 'Kelime'),
                 'vote_count': result['vote_count']
-            }, room=room_id)
+            })
         else:
             # Yanlış kişi seçildi
-            emit('game_ended', {
+            emit_room_event(room, 'game_ended', {
                 'result': 'spy_wins',
                 'message': f'🕵️ Casuslar kazandı! Yanlış kişiyi seçtiniz. Casuslar: {spy_names}',
                 'voted_player': winner,
                 'spy_player': spy_names,
                 'spy_players': spy_players,
                 'country': room.selected_country,
+                'label': room.deck.pack.meta.get('label', 'Kelime'),
                 'vote_count': result['vote_count']
-            }, room=room_id)
+            })
+        
+        record_game(room, result, winner is not None and winner in spy_players)
+
+def record_game(room, result, spy_caught):
+    """Oyunun sonucunu geçmiş kuyruğuna bırakır (diske yazıcı thread yazar)"""
+    if history is None:
+        return
+    history.record({
+        'room_id': room.room_id,
+        'room_name': room.room_name,
+        'pack': room.deck.pack.name,
+        'word': room.selected_country,
+        'result': 'citizens_win' if spy_caught else 'spy_wins',
+        'voted_player': result['winner'],
+        'votes': dict(result['vote_count']),
+        'players': [(player.name, player.is_spy) for player in room.players.values()],
+        'ended_at': time.time()
+    })
 
 def handle_vote_results(room_id):
     if room_id in game_rooms:
@@ -508,16 +1329,18 @@ def handle_vote_results(room_id):
             # Eşitlik durumu - sadece bağlı oyuncular arasında eşitlik varsa
             connected_tied_players = []
             for tied_player in results['tied_players']:
-                for pid, player in room.players.items():
-                    if player['name'] == tied_player and player['connected']:
-                        connected_tied_players.append({'name': tied_player})
-                        break
+                tied_player_id = room.find_player(tied_player)
+                if tied_player_id is not None and room.players[tied_player_id].connected:
+                    connected_tied_players.append({'name': tied_player})
             
-            emit('vote_tie', {
+            # Yeniden oylama için süre baştan başlar
+            deadline = schedule_phase(room, app.config['VOTING_SECONDS'])
+            emit_room_event(room, 'vote_tie', {
                 'message': f'Eşitlik! {", ".join(results["tied_players"])} arasında tekrar oylama.',
                 'tied_players': connected_tied_players,
-                'vote_count': results['vote_count']
-            }, room=room_id)
+                'vote_count': results['vote_count'],
+                'deadline': deadline
+            })
             
             # Oylamayı sıfırla
             room.reset_voting()
@@ -527,109 +1350,349 @@ def handle_vote_results(room_id):
             handle_game_end(room_id, results)
 
 @socketio.on('send_message')
+@rate_limited('send_message')
+@room_event
+@metrics.instrument('send_message')
 def handle_message(data):
-    room_id = data.get('room_id')
-    message = data.get('message')
     player_id = request.sid
+    room_id = data.get('room_id') or player_rooms.get(player_id)
+    message = data.get('message')
+    
+    if not isinstance(message, str) or not message.strip():
+        return
+    if len(message) > app.config['MAX_CHAT_LENGTH']:
+        metrics.registry.record_drop('send_message', 'size')
+        emit('chat_error', {'message': f"Mesaj en fazla {app.config['MAX_CHAT_LENGTH']} karakter olabilir!"})
+        return
     
     if room_id in game_rooms and player_id in game_rooms[room_id].players:
-        player_name = game_rooms[room_id].players[player_id]['name']
-        emit('new_message', {
-            'player_name': player_name,
-            'message': message,
+        room = game_rooms[room_id]
+        line = {
+            'player_name': room.players[player_id].name,
+            'message': message.strip(),
             'timestamp': datetime.now().strftime('%H:%M')
-        }, room=room_id)
+        }
+        window = app.config['CHAT_BATCH_WINDOW']
+        if room.chat_batch is None:
+            room.chat_batch = [line]
+            if window > 0:
+                scheduler.schedule(('chat', room_id), window, run_in_room, room_id, flush_chat, room_id)
+                return
+        else:
+            room.chat_batch.append(line)
+            if len(room.chat_batch) < app.config['CHAT_BATCH_MAX']:
+                return
+        scheduler.cancel(('chat', room_id))
+        flush_chat(room_id)
+
+def flush_chat(room_id):
+    """Biriken sohbet satırlarını tek bir new_message olayıyla yayınlar"""
+    room = game_rooms.get(room_id)
+    if room is None or not room.chat_batch:
+        return
+    lines, room.chat_batch = room.chat_batch, None
+    emit_room_event(room, 'new_message', {'messages': lines})
 
 @socketio.on('leave_room')
+@rate_limited('leave_room')
+@room_event
+@metrics.instrument('leave_room')
 def handle_leave_room(data):
-    room_id = data.get('room_id')
     player_id = request.sid
-    
-    print(f"DEBUG: Leave room request - Room ID: {room_id}, Player: {player_id}")
+    room_id = data.get('room_id') or player_rooms.get(player_id)
     
     if room_id in game_rooms:
         room = game_rooms[room_id]
         if player_id in room.players:
-            player_name = room.players[player_id]['name']
+            player_name = room.players[player_id].name
+            public_id = room.players[player_id].public_id
             room.remove_player(player_id)
             leave_room(room_id)
             
-            emit('player_left', {
-                'player_name': player_name,
-                'players': list(room.players.values()),
-                'player_count': len(room.players)
-            }, room=room_id)
+            emit_roster_update('player_left', room, room.roster_delta(removed=[public_id]),
+                               player_name=player_name)
+            
+            log.info('player left', extra=logs.fields(room_id=room_id, player=player_name))
             
-            print(f"DEBUG: {player_name} left room {room_id}")
+            if not room.players:
+                delete_room(room_id)
 
 @socketio.on('reset_game')
+@rate_limited('reset_game')
+@room_event
+@metrics.instrument('reset_game')
 def handle_reset_game(data):
     room_id = data.get('room_id')
     player_id = request.sid
     
-    print(f"DEBUG: Reset game request - Room ID: {room_id}, Player: {player_id}")
-    
     if room_id in game_rooms:
         room = game_rooms[room_id]
         if player_id in room.players:
             # Oyunu sıfırla
             room.reset_game()
+            scheduler.cancel(('phase', room_id))
             
-            print(f"DEBUG: Game reset in room {room_id}. Active players: {len(room.players)}")
+            log.info('game reset', extra=logs.fields(room_id=room_id, players=len(room.players)))
             
             # Tüm oyunculara reset bildir
-            emit('game_reset', {
-                'message': f'{room.players[player_id]["name"]} oyunu sıfırladı!',
-                'players': list(room.players.values())
-            }, room=room_id)
+            emit_room_event(room, 'game_reset', {
+                'message': f'{room.players[player_id].name} oyunu sıfırladı!'
+            })
             
         else:
             emit('join_error', {'message': 'Bu odada değilsiniz!'})
     else:
         emit('join_error', {'message': 'Oda bulunamadı!'})
 
-# Ping handler kaldırıldı - heartbeat sistemi kullanılıyor
+@socketio.on('request_roster')
+@rate_limited('request_roster')
+@room_event
+@metrics.instrument('request_roster')
+def handle_request_roster(data):
+    """İstemci sürüm uyuşmazlığında oyuncu listesinin tamamını ister"""
+    player_id = request.sid
+    room_id = data.get('room_id') or player_rooms.get(player_id)
+    
+    if room_id in game_rooms and player_id in game_rooms[room_id].players:
+        emit('roster_snapshot', game_rooms[room_id].roster_snapshot())
+
+@socketio.on('lobby_subscribe')
+@rate_limited('lobby_subscribe')
+@metrics.instrument('lobby_subscribe')
+def handle_lobby_subscribe(data=None):
+    """Lobi sayfasını gönderir; sonraki değişiklikler toplu `lobby_update` olarak gelir"""
+    if not app.config['LOBBY_ENABLED']:
+        return
+    page = data.get('page', 0) if isinstance(data, dict) else 0
+    page = page if isinstance(page, int) and page >= 0 else 0
+    lobby_subscribers[request.sid] = page
+    emit('lobby_update', lobby_page(page))
+
+@socketio.on('lobby_unsubscribe')
+@rate_limited('lobby_unsubscribe')
+@metrics.instrument('lobby_unsubscribe')
+def handle_lobby_unsubscribe(data=None):
+    lobby_subscribers.pop(request.sid, None)
 
 @socketio.on('disconnect')
+@room_event
+@metrics.instrument('disconnect')
 def handle_disconnect():
     player_id = request.sid
-    print(f"DEBUG: Player {player_id} disconnected")
+    limiter.forget(player_id)
+    lobby_subscribers.pop(player_id, None)
+    log.debug('socket disconnected', extra=logs.fields(sid=player_id))
     
-    # Oyuncuyu tüm odalardan çıkar
-    for room_id, room in game_rooms.items():
-        if player_id in room.players:
-            player_name = room.players[player_id]['name']
-            
-            # Oyuncuyu disconnected olarak işaretle (hemen silme)
-            room.players[player_id]['connected'] = False
-            room.players[player_id]['disconnect_time'] = time.time()
-            
-            print(f"DEBUG: {player_name} marked as disconnected in room {room_id}")
-            
-            # Diğer oyunculara bildir
-            emit('player_left', {
-                'player_name': player_name,
-                'players': list(room.players.values()),
-                'player_count': len(room.players)
-            }, room=room_id)
-            
-            # 10 dakika sonra oyuncuyu tamamen sil (uzun ekran kapatma için)
-            def remove_player_delayed():
-                time.sleep(600)  # 10 dakika
-                if room_id in game_rooms and player_id in game_rooms[room_id].players:
-                    if not game_rooms[room_id].players[player_id]['connected']:
-                        print(f"DEBUG: Removing {player_name} permanently from room {room_id} after 10 minutes")
-                        game_rooms[room_id].remove_player(player_id)
-                        socketio.emit('player_left', {
-                            'player_name': player_name,
-                            'players': list(game_rooms[room_id].players.values()),
-                            'player_count': len(game_rooms[room_id].players)
-                        }, room=room_id)
-            
-            # Background task olarak çalıştır
-            socketio.start_background_task(target=remove_player_delayed)
-            break
+    # Oyuncunun bulunduğu odayı indeksten bul
+    room_id = player_rooms.get(player_id)
+    room = game_rooms.get(room_id)
+    if room is not None and player_id in room.players:
+        mark_disconnected(room, player_id)
+
+def mark_disconnected(room, player_id):
+    """Oyuncuyu kopmuş sayar (hemen silmez) ve gecikmeli silmeyi planlar"""
+    player = room.players[player_id]
+    if not player.connected:
+        return
+    
+    # Oyuncuyu disconnected olarak işaretle (hemen silme)
+    room.set_connected(player_id, False)
+    player.disconnect_time = time.time()
+    
+    log.info('player disconnected', extra=logs.fields(room_id=room.room_id, player=player.name))
+    
+    # Diğer oyunculara bildir
+    emit_roster_update('player_left', room, room.roster_delta(changed=[player_id]),
+                       player_name=player.name)
+    
+    # Belirli süre sonra oyuncuyu tamamen sil (uzun ekran kapatma için)
+    scheduler.schedule(('remove_player', player_id), app.config['PLAYER_REMOVE_DELAY'],
+                       run_in_room, room.room_id, remove_player_delayed, room.room_id, player_id, player.name)
+
+def sweep_liveness():
+    """Bağlı görünen ama sinyali kesilmiş oyuncuları tek geçişte bulur"""
+    for room_id, player_id in liveness.stale_players(game_rooms):
+        run_in_room(room_id, expire_player, room_id, player_id)
+    scheduler.schedule(('liveness',), app.config['LIVENESS_SWEEP_INTERVAL'], sweep_liveness)
+
+def expire_player(room_id, player_id):
+    room = game_rooms.get(room_id)
+    if room is not None and player_id in room.players and liveness.is_stale(player_id, room.players[player_id]):
+        log.info('player timed out', extra=logs.fields(room_id=room_id, player=room.players[player_id].name))
+        mark_disconnected(room, player_id)
+
+scheduler.schedule(('liveness',), app.config['LIVENESS_SWEEP_INTERVAL'], sweep_liveness)
+
+def remove_player_delayed(room_id, player_id, player_name):
+    """Bağlantısı uzun süre kopuk kalan oyuncuyu odadan tamamen siler"""
+    if room_id in game_rooms and player_id in game_rooms[room_id].players:
+        if not game_rooms[room_id].players[player_id].connected:
+            log.info('player removed', extra=logs.fields(room_id=room_id, player=player_name))
+            room = game_rooms[room_id]
+            public_id = room.players[player_id].public_id
+            room.remove_player(player_id)
+            emit_roster_update('player_left', room, room.roster_delta(removed=[public_id]),
+                               player_name=player_name)
+            
+            if not room.players:
+                delete_room(room_id)
+
+# Snapshot: değişen odalar periyodik olarak dosyaya eklenir, açılışta geri yüklenir
+snapshots = (SnapshotLog(app.config['SNAPSHOT_PATH'].format(worker=app.config['WORKER_INDEX']))
+             if app.config['SNAPSHOT_PATH'] else None)
+snapshot_lock = threading.Lock()
+snapshot_pending = deque()  # aktörlerde alınmış, dosyaya yazılmayı bekleyen oda durumları
+snapshot_versions = {}      # room_id -> durumu alınan son last_activity
+snapshot_states = {}        # room_id -> dosyadaki son durum (sıkıştırma için)
+draining = False
+# Snapshot dosyası hâlâ eski process'te: o odalarını devredene kadar oda sunulmaz ve dosyaya yazılmaz
+# (start_snapshots çağrılana kadar snapshot'lar hiç devrede değildir)
+standby = False
+RESTART_MESSAGE = 'Sunucu yeniden başlatılıyor, birkaç saniye içinde otomatik olarak yeniden bağlanacaksınız.'
+
+def capture_room(room_id):
+    room = game_rooms.get(room_id)
+    if room is not None:
+        snapshot_pending.append(room.to_state())
+
+def write_snapshot():
+    """Değişen ve silinen odaları dosyaya ekler, gerekirse sıkıştırır ve kendini yeniden planlar"""
+    if draining:
+        return
+    if standby:
+        take_over()
+        scheduler.schedule(('snapshot',), app.config['SNAPSHOT_INTERVAL'], write_snapshot)
+        return
+    records = []
+    while snapshot_pending:
+        state = snapshot_pending.popleft()
+        if state['id'] in game_rooms:  # durumu alındıktan sonra silinmiş olabilir
+            records.append(state)
+    
+    with snapshot_lock:
+        records += [{'id': room_id, 'deleted': True}
+                    for room_id in list(snapshot_states) if room_id not in game_rooms]
+        for record in records:
+            if record.get('deleted'):
+                snapshot_states.pop(record['id'], None)
+                snapshot_versions.pop(record['id'], None)
+            else:
+                snapshot_states[record['id']] = record
+        # Kayıtlar döngüde toplanır; yazma ve fsync bir OS thread'inde yapılır,
+        # beklerken diğer odaların olayları işlenmeye devam eder
+        try:
+            if snapshots.needs_compaction(len(snapshot_states)):
+                native.offload(snapshots.compact, list(snapshot_states.values()))
+            else:
+                native.offload(snapshots.append, records)
+        except OSError:
+            log.exception('snapshot write failed')
+    
+    # Son yazımdan beri olayı olan odaların durumu, kendi aktörlerinde alınır
+    for room_id, room in list(game_rooms.items()):
+        if snapshot_versions.get(room_id) != room.last_activity:
+            snapshot_versions[room_id] = room.last_activity
+            run_in_room(room_id, capture_room, room_id)
+    scheduler.schedule(('snapshot',), app.config['SNAPSHOT_INTERVAL'], write_snapshot)
+
+def restore_rooms(states):
+    """Snapshot'taki, bu worker'a ait ve bellekte olmayan odaları kurar"""
+    restored = 0
+    for room_id, state in states.items():
+        if room_id in game_rooms or not owns_room(room_id):
+            continue
+        pack_name = state['pack'] if state['pack'] in word_packs else app.config['DEFAULT_WORD_PACK']
+        room = SpyGameRoom.from_state(state, word_packs.get(pack_name))
+        game_rooms[room_id] = room
+        room_codes.reserve(room_id)
+        update_lobby(room)
+        snapshot_versions[room_id] = room.last_activity
+        snapshot_states[room_id] = state
+        # Oyuncular token'larıyla dönene kadar kopuk; dönmeyenler her zamanki gibi silinir
+        for player_id, player in room.players.items():
+            player_rooms[player_id] = room_id
+            scheduler.schedule(('remove_player', player_id), app.config['PLAYER_REMOVE_DELAY'],
+                               run_in_room, room_id, remove_player_delayed, room_id, player_id, player.name)
+        if room.phase_deadline:
+            delay = max(0, room.phase_deadline / 1000 - time.time())
+            scheduler.schedule(('phase', room_id), delay,
+                               run_in_room, room_id, phase_timeout, room_id, room.phase_deadline)
+        restored += 1
+    return restored
+
+def take_over():
+    """Snapshot dosyasının sahipliğini almayı dener; alınca odaları kurar.
+    
+    Eski process kapanırken tamamlanmış bir devir bıraktıysa odalar ondan,
+    yoksa (ör. çöktüyse) ana dosyadan yüklenir.
+    """
+    global standby
+    with snapshot_lock:
+        if not standby or draining or not snapshots.acquire():
+            return False
+        states, source = native.offload(snapshots.read_handoff), 'handoff'
+        if states is None:
+            states, source = native.offload(snapshots.load), 'snapshot'
+        restored = restore_rooms(states)
+        if source == 'handoff':
+            # Devir önce ana dosyaya işlenir, sonra silinir (arada çökülürse devir yeniden okunur)
+            try:
+                native.offload(snapshots.compact, list(snapshot_states.values()))
+                snapshots.remove_handoff()
+            except OSError:
+                log.exception('snapshot write failed')
+        standby = False
+    log.info('rooms restored', extra=logs.fields(rooms=restored, source=source, path=snapshots.path))
+    return True
+
+def drain_rooms():
+    """Kapanmadan önce tüm odaları devir dosyasına yazar ve istemcileri yeni process'e yollar"""
+    global draining
+    if draining or snapshots is None:
+        return
+    draining = True
+    scheduler.cancel(('snapshot',))
+    # Handler'lar durmak üzere; durum aktörler beklenmeden alınır
+    states = [room.to_state() for room in list(game_rooms.values())]
+    with snapshot_lock:
+        if not snapshots.owned:
+            return  # hiç oda sunmadık, devredecek bir şey yok
+        try:
+            # Sinyal handler'ında çalışır ve process zaten kapanıyor; devir doğrudan yazılır
+            snapshots.write_handoff(states)
+        except OSError:
+            log.exception('handoff write failed')
+        # Bekleyen yeni process kilidi alıp devri okuyabilir
+        snapshots.release()
+    for room in list(game_rooms.values()):
+        emit_to_room(room, 'server_restart', {'message': RESTART_MESSAGE})
+    log.info('rooms drained', extra=logs.fields(rooms=len(states)))
+
+def handle_sigterm(signum, frame):
+    drain_rooms()
+    socketio.sleep(1)  # server_restart paketleri gönderilsin
+    raise SystemExit(0)
+
+def start_snapshots():
+    """Snapshot dosyasının sahipliğini almayı dener ve periyodik yazmayı başlatır.
+    
+    Import sırasında değil sunucu başlarken çağrılır (app.py ve wsgi.py ana
+    blokları, gunicorn.conf.py post_worker_init); modülü import eden araçlar
+    kilide ve dosyaya dokunmaz.
+    """
+    global standby
+    if snapshots is None or standby or snapshots.owned:
+        return
+    standby = True
+    if not take_over():
+        log.info('waiting for previous process to hand off rooms', extra=logs.fields(path=snapshots.path))
+    scheduler.schedule(('snapshot',), app.config['SNAPSHOT_INTERVAL'], write_snapshot)
 
 if __name__ == '__main__':
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    start_snapshots()
     port = int(os.environ.get('PORT', 5000))
-    socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True) 
\ No newline at end of file
+    if socketio.async_mode == 'threading':
+        socketio.run(app, host='0.0.0.0', port=port, debug=False, allow_unsafe_werkzeug=True)
+    else:
+        socketio.run(app, host='0.0.0.0', port=port, debug=False) 
\ No newline at end of file
@@ -0,0 +1,272 @@
+"""Statik dosyalar ve sayfalar için sıkıştırılmış, ETag'li yanıtlar.
+
+Açılışta `static/` altındaki .js ve .css dosyaları küçültülür, içerik
+özetiyle adlandırılır (`game.3f9c2a1b7e.js`) ve gzip (varsa brotli) ile bir
+kez sıkıştırılır. Özetli adlar hiç değişmediği için bir yıl ve `immutable`
+ile önbelleğe alınır; istemci her istekte yalnızca kendi desteklediği
+kodlamanın hazır hâlini alır, sunucu istek başına sıkıştırma yapmaz.
+
+Küçültme bağımlılıksızdır ve bilinçli olarak tutucudur: yorumlar ve
+girintiler atılır, dizgeler, şablon dizgeleri ve regex'ler olduğu gibi
+kopyalanır, satır sonları ASI'yi etkileyebilecek yerlerde korunur.
+"""
+import gzip
+import hashlib
+import os
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:  # isteğe bağlı bağımlılık
+    brotli = None
+
+CONTENT_TYPES = {
+    '.js': 'application/javascript; charset=utf-8',
+    '.css': 'text/css; charset=utf-8',
+    '.html': 'text/html; charset=utf-8',
+}
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Kodlamalar tercih sırasıyla
+_ENCODINGS = ('br', 'gzip')
+
+
+class Asset:
+    """Bir kez sıkıştırılmış içerik ve kodlama başına ETag"""
+    __slots__ = ('content_type', 'digest', 'bodies')
+
+    def __init__(self, body, content_type):
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.bodies = {'identity': body}
+        compressed = {'gzip': gzip.compress(body, 9, mtime=0)}
+        if brotli is not None:
+            compressed['br'] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.bodies[encoding] = data
+
+    def encoding_for(self, accept_encodings):
+        for encoding in _ENCODINGS:
+            if encoding in self.bodies and accept_encodings[encoding]:
+                return encoding
+        return 'identity'
+
+    def response(self, request, cache_control):
+        """İstemcinin kabul ettiği hazır kodlamayla yanıt (If-None-Match'e 304)"""
+        encoding = self.encoding_for(request.accept_encodings)
+        response = Response(self.bodies[encoding], content_type=self.content_type)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f'{self.digest[:16]}-{encoding}')
+        response.headers['Cache-Control'] = cache_control
+        return response.make_conditional(request)
+
+
+class AssetPipeline:
+    """`static/` altındaki .js/.css dosyalarının küçültülmüş, özetli kopyaları"""
+
+    def __init__(self, static_dir):
+        self.urls = {}   # dosya adı -> özetli ad
+        self.files = {}  # özetli ad -> Asset
+        for name in sorted(os.listdir(static_dir)):
+            stem, ext = os.path.splitext(name)
+            minify = MINIFIERS.get(ext)
+            if minify is None:
+                continue
+            with open(os.path.join(static_dir, name), encoding='utf-8') as f:
+                body = minify(f.read()).encode('utf-8')
+            asset = Asset(body, CONTENT_TYPES[ext])
+            fingerprinted = f'{stem}.{asset.digest[:10]}{ext}'
+            self.urls[name] = fingerprinted
+            self.files[fingerprinted] = asset
+
+    def __contains__(self, name):
+        return name in self.urls
+
+    def get(self, filename):
+        """(Asset, güncel mi); özeti eski bir addan istenen dosyanın güncel hâli de verilir"""
+        asset = self.files.get(filename)
+        if asset is not None:
+            return asset, True
+        stem, ext = os.path.splitext(filename)
+        current = self.urls.get(os.path.splitext(stem)[0] + ext)
+        return (self.files[current], False) if current else (None, False)
+
+
+# Küçültme
+
+_WORD = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$\\')
+# Bu karakterlerin çevresindeki boşluk anlamı değiştirmeden atılabilir
+_JS_TIGHT = frozenset('{}()[];,:=<>?!&|')
+# Bu karakterlerden sonraki satır sonu ASI'yi etkilemez
+_JS_OPEN = frozenset('{([,;:=?&|<>!')
+_JS_CLOSE = frozenset('})],;:?=.')
+# `/` bunlardan sonra geliyorsa bölme değil regex başlangıcıdır
+_JS_REGEX_AFTER = frozenset('(,=:[!&|?{};+-*%<>~^')
+_JS_REGEX_KEYWORDS = ('return', 'typeof', 'case', 'in', 'of', 'delete', 'void', 'throw', 'new')
+
+
+def _skip_string(source, i):
+    """`source[i]` ile açılan dizgenin bittiği konumun bir sonrası"""
+    quote = source[i]
+    i += 1
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == quote:
+            return i + 1
+        if quote == '`' and source.startswith('${', i):
+            i = _skip_code(source, i + 2, '}')
+            continue
+        i += 1
+    return i
+
+
+def _skip_code(source, i, closer):
+    """Şablon içindeki `${...}` ifadesinin kapanışının bir sonrası"""
+    depth = 0
+    while i < len(source):
+        c = source[i]
+        if c in '\'"`':
+            i = _skip_string(source, i)
+            continue
+        if c == '{':
+            depth += 1
+        elif c == closer:
+            if depth == 0:
+                return i + 1
+            depth -= 1
+        i += 1
+    return i
+
+
+def _skip_regex(source, i):
+    in_class = False
+    i += 1
+    while i < len(source):
+        c = source[i]
+        if c == '\\':
+            i += 2
+            continue
+        if c == '\n':
+            break
+        if c == '[':
+            in_class = True
+        elif c == ']':
+            in_class = False
+        elif c == '/' and not in_class:
+            i += 1
+            while i < len(source) and source[i] in _WORD:
+                i += 1  # bayraklar
+            break
+        i += 1
+    return i
+
+
+def _regex_allowed(out):
+    text = ''.join(out[-8:]).rstrip()
+    if not text:
+        return True
+    if text[-1] in _JS_REGEX_AFTER:
+        return True
+    return any(text.endswith(keyword) and (len(text) == len(keyword) or text[-len(keyword) - 1] not in _WORD)
+               for keyword in _JS_REGEX_KEYWORDS)
+
+
+def minify_js(source):
+    out = []
+    gap = ''  # atlanan boşluk: '', ' ' ya da '\n'
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in ' \t\r\n':
+            if c == '\n' or gap == '\n':
+                gap = '\n'
+            elif not gap:
+                gap = ' '
+            i += 1
+            continue
+        if source.startswith('//', i):
+            end = source.find('\n', i)
+            i = n if end < 0 else end
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            gap = gap or ' '
+            continue
+
+        if gap and out:
+            prev = out[-1][-1]
+            if gap == '\n':
+                if prev not in _JS_OPEN and c not in _JS_CLOSE:
+                    out.append('\n')
+            elif prev not in _JS_TIGHT and c not in _JS_TIGHT:
+                out.append(' ')
+        gap = ''
+
+        if c in '\'"`':
+            end = _skip_string(source, i)
+        elif c == '/' and _regex_allowed(out):
+            end = _skip_regex(source, i)
+        else:
+            end = i + 1
+        out.append(source[i:end])
+        i = end
+    return ''.join(out) + '\n'
+
+
+# CSS'te bu karakterlerin çevresindeki boşluk anlamsızdır
+_CSS_TIGHT = frozenset('{};,>')
+# Bildirim bloklarında `:` da öyledir; seçicide ise `.a :hover` ile `.a:hover` farklıdır
+_CSS_TIGHT_DECLARATIONS = _CSS_TIGHT | {':'}
+# İçinde bildirim değil kural bulunan at-rule'lar
+_CSS_GROUPING = ('@media', '@supports', '@container', '@layer', '@document')
+
+
+def minify_css(source):
+    out = []
+    gap = False
+    blocks = []    # açık blokların her biri için: bildirim bloğu mu
+    prelude = 0    # `out` içinde mevcut seçicinin / at-rule'un başladığı yer
+    i, n = 0, len(source)
+    while i < n:
+        c = source[i]
+        if c in ' \t\r\n':
+            gap = True
+            i += 1
+            continue
+        if source.startswith('/*', i):
+            end = source.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            gap = True
+            continue
+        tight = _CSS_TIGHT_DECLARATIONS if blocks and blocks[-1] else _CSS_TIGHT
+        if gap and out and out[-1][-1] not in tight and c not in tight:
+            out.append(' ')
+        gap = False
+        if c == '{':
+            blocks.append(not ''.join(out[prelude:]).startswith(_CSS_GROUPING))
+        elif c == '}':
+            if out and out[-1] == ';':
+                out.pop()  # bloğun son `;`'ı gereksiz (dizge içindeki `;}` ayrı bir parçadır)
+            if blocks:
+                blocks.pop()
+        if c in '\'"':
+            end = _skip_string(source, i)
+        else:
+            end = i + 1
+        out.append(source[i:end])
+        i = end
+        if c in '{};':
+            prelude = len(out)
+    return ''.join(out) + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css}
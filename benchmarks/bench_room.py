@@ -0,0 +1,218 @@
+"""SpyGameRoom'un sıcak metotları için mikro benchmark.
+
+Her metot farklı oyuncu ve oda sayılarında ölçülür; çağrı başına süre ve
+tracemalloc ile çağrı başına ayrılan bellek (byte ve blok) raporlanır.
+Oyuncu sayısı büyürken çağrı başına süresi büyüyen bir metot, oda modelinde
+algoritmik bir gerilemeye işaret eder.
+
+    python benchmarks/bench_room.py > current.json
+    python benchmarks/bench_room.py --compare benchmarks/bench_room_baseline.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Yalnızca oda modeli ölçülür: app import edilirken snapshot ve oyun geçmişi
+# dosyalarına (çalışan bir sunucununkiler olabilir) dokunulmasın
+os.environ['SNAPSHOT_PATH'] = ''
+os.environ['HISTORY_DB'] = ''
+
+from app import SpyGameRoom  # noqa: E402
+
+METHODS = ('add_player', 'start_game', 'add_vote', 'check_instant_majority',
+           'count_votes', 'reset_voting', 'get_player_info')
+
+
+def _make_rooms(room_count, player_count, fill=True):
+    rooms = []
+    for r in range(room_count):
+        room = SpyGameRoom(f'R{r}', f'bench{r}', 'sid0', max_players=player_count)
+        if fill:
+            for i in range(player_count):
+                room.add_player(f'sid{i}', f'player{i}')
+        rooms.append(room)
+    return rooms
+
+
+def _targets(player_count):
+    # Oylar iki adaya bölünür: çoğunluk oluşmaz, eşitlik takibi çalışır
+    return [f'player{1 if i % 2 == 0 else 0}' for i in range(player_count)]
+
+
+def _start(rooms):
+    for room in rooms:
+        room.start_game()
+        room.voting_phase = True
+
+
+def _vote_all(rooms, player_count):
+    targets = _targets(player_count)
+    for room in rooms:
+        for i in range(player_count):
+            room.add_vote(f'sid{i}', targets[i])
+
+
+def _measure(method, rooms, player_count, repeat):
+    """(prepare, run) çiftini kurar; run çağrı sayısını ve sonuçları döner"""
+    targets = _targets(player_count)
+    ids = [f'sid{i}' for i in range(player_count)]
+
+    if method == 'add_player':
+        def prepare():
+            rooms[:] = _make_rooms(len(rooms), player_count, fill=False)
+
+        def run(keep):
+            for room in rooms:
+                for i, pid in enumerate(ids):
+                    keep.append(room.add_player(pid, f'player{i}'))
+            return len(rooms) * player_count
+
+    elif method == 'start_game':
+        def prepare():
+            for room in rooms:
+                room.reset_game()
+
+        def run(keep):
+            for room in rooms:
+                keep.append(room.start_game())
+            return len(rooms)
+
+    elif method == 'add_vote':
+        def prepare():
+            for room in rooms:
+                room.reset_voting()
+
+        def run(keep):
+            for room in rooms:
+                for pid, target in zip(ids, targets):
+                    keep.append(room.add_vote(pid, target))
+            return len(rooms) * player_count
+
+    elif method == 'reset_voting':
+        def prepare():
+            for room in rooms:
+                room.reset_voting()
+            _vote_all(rooms, player_count)
+
+        def run(keep):
+            for room in rooms:
+                keep.append(room.reset_voting())
+            return len(rooms)
+
+    elif method in ('check_instant_majority', 'count_votes'):
+        def prepare():
+            for room in rooms:
+                room.reset_voting()
+            _vote_all(rooms, player_count)
+
+        def run(keep):
+            for room in rooms:
+                fn = getattr(room, method)
+                for _ in range(repeat):
+                    keep.append(fn())
+            return len(rooms) * repeat
+
+    elif method == 'get_player_info':
+        def prepare():
+            pass
+
+        def run(keep):
+            for room in rooms:
+                for pid in ids:
+                    keep.append(room.get_player_info(pid))
+            return len(rooms) * player_count
+
+    return prepare, run
+
+
+def bench(method, room_count, player_count, repeat, rounds):
+    rooms = _make_rooms(room_count, player_count)
+    _start(rooms)
+    prepare, run = _measure(method, rooms, player_count, repeat)
+
+    best = None
+    for _ in range(rounds):
+        prepare()
+        keep = []
+        started = time.perf_counter()
+        calls = run(keep)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+
+    # Bellek ölçümü ayrı turda: dönen değerler tutulur ki ayrılan nesneler sayılsın
+    prepare()
+    keep = []
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    calls = run(keep)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    size = sum(stat.size_diff for stat in diff)
+    blocks = sum(stat.count_diff for stat in diff)
+
+    return {
+        'method': method,
+        'players': player_count,
+        'rooms': room_count,
+        'calls': calls,
+        'ns_per_call': round(best / calls * 1e9, 1),
+        'bytes_per_call': round(size / calls, 1),
+        'blocks_per_call': round(blocks / calls, 2),
+    }
+
+
+def compare(results, baseline_path, tolerance):
+    """Baseline'a göre `tolerance` katından yavaş olan ölçümleri döner"""
+    with open(baseline_path) as f:
+        baseline = {(r['method'], r['players'], r['rooms']): r for r in json.load(f)['results']}
+    regressions = []
+    for row in results:
+        base = baseline.get((row['method'], row['players'], row['rooms']))
+        if base and row['ns_per_call'] > base['ns_per_call'] * tolerance:
+            regressions.append({'method': row['method'], 'players': row['players'],
+                                'rooms': row['rooms'], 'baseline_ns': base['ns_per_call'],
+                                'current_ns': row['ns_per_call']})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', default='8,64,512,4096')
+    parser.add_argument('--rooms', default='1,16,128')
+    parser.add_argument('--max-total', type=int, default=65536,
+                        help='skip combinations with more players than this in total')
+    parser.add_argument('--methods', default=','.join(METHODS))
+    parser.add_argument('--repeat', type=int, default=200,
+                        help='calls per room for methods that do not depend on the player count')
+    parser.add_argument('--rounds', type=int, default=3, help='timed rounds, best is reported')
+    parser.add_argument('--compare', help='baseline JSON; exit 1 on regressions')
+    parser.add_argument('--tolerance', type=float, default=3.0)
+    args = parser.parse_args()
+
+    results = []
+    for method in args.methods.split(','):
+        for player_count in [int(n) for n in args.players.split(',')]:
+            for room_count in [int(n) for n in args.rooms.split(',')]:
+                if player_count * room_count > args.max_total:
+                    continue
+                row = bench(method, room_count, player_count, args.repeat, args.rounds)
+                results.append(row)
+                print(f"{method:24s} players={player_count:5d} rooms={room_count:4d}  "
+                      f"{row['ns_per_call']:10.1f} ns/call  {row['bytes_per_call']:8.1f} B/call",
+                      file=sys.stderr)
+
+    report = {'python': sys.version.split()[0], 'results': results}
+    if args.compare:
+        report['regressions'] = compare(results, args.compare, args.tolerance)
+    print(json.dumps(report, indent=2))
+    if args.compare and report['regressions']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,316 @@
+"""Uçtan uca yük testi: N oda için oyuncuları tüm oyun döngüsünden geçirir.
+
+Sunucuyu yerelde başlatır (ya da --url ile var olana bağlanır) ve her oda
+için python-socketio istemcileriyle create_room, join_room, heartbeat,
+start_game, start_voting, send_message, submit_vote (önce eşitlik, sonra
+çoğunluk), reset_game akışını çalıştırır. Ardından bağlantı kopma / yeniden
+bağlanma fırtınası yapılır. Sonuçlar JSON olarak stdout'a (veya --output
+dosyasına) yazılır, böylece app.py değişikliklerinden önceki ve sonraki
+koşular karşılaştırılabilir.
+
+    pip install "python-socketio[client]"
+    python benchmarks/loadtest.py --rooms 50 --players 4 --games 2
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Player:
+    """Tek bir oyuncu bağlantısı; gelen olayları sayar ve bekletir"""
+
+    def __init__(self, url, name, stats, worker=0, codec='json'):
+        self.url = url
+        self.name = name
+        self.stats = stats
+        self.worker = worker
+        self.codec = codec
+        self.token = None
+        self.last_seq = 0
+        self.received = {}
+        self.last_payload = {}
+        self.cond = threading.Condition()
+        self.new_client()
+
+    def new_client(self):
+        serializer = 'msgpack' if self.codec == 'msgpack' else 'default'
+        self.sio = socketio.Client(reconnection=False, serializer=serializer)
+        self.sio.on('*', self._on_event)
+
+    def _on_event(self, event, data=None):
+        now = time.perf_counter()
+        with self.cond:
+            self.received[event] = self.received.get(event, 0) + 1
+            self.last_payload[event] = (now, data)
+            if isinstance(data, dict) and isinstance(data.get('seq'), int):
+                self.last_seq = max(self.last_seq, data['seq'])
+            self.cond.notify_all()
+        self.stats.count_received()
+
+    def connect(self):
+        self.sio.connect(f'{self.url}?worker={self.worker}&codec={self.codec}', transports=['websocket'])
+
+    def disconnect(self):
+        if self.sio.connected:
+            self.sio.disconnect()
+
+    def emit(self, event, data):
+        self.sio.emit(event, data)
+        self.stats.count_sent()
+        return time.perf_counter()
+
+    def mark(self, event):
+        with self.cond:
+            return self.received.get(event, 0)
+
+    def wait(self, event, since, timeout):
+        """`since` sayısından fazla `event` gelene kadar bekler, payload'ı döner"""
+        deadline = time.monotonic() + timeout
+        with self.cond:
+            while self.received.get(event, 0) <= since:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f'{self.name}: {event} not received')
+                self.cond.wait(remaining)
+            return self.last_payload[event]
+
+
+class Stats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.received = 0
+        self.vote_to_end = []
+        self.reconnect = []
+        self.errors = []
+        self.games = 0
+
+    def count_sent(self):
+        with self.lock:
+            self.sent += 1
+
+    def count_received(self):
+        with self.lock:
+            self.received += 1
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+
+    def pick(q):
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 3)
+
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99),
+            'mean_ms': round(statistics.fmean(ordered) * 1000, 3), 'samples': len(ordered)}
+
+
+def _vote_round(players, targets, event, timeout):
+    """Her oyuncu targets[i]'ye oy verir; son oyun olayının gecikmesini döner"""
+    before = players[0].mark(event)
+    sent_at = []
+    for player, target in zip(players, targets):
+        sent_at.append(player.emit('submit_vote', {'room_id': player.room_id, 'voted_player': target}))
+    received_at, payload = players[0].wait(event, before, timeout)
+    # Sonucu tetikleyen oy, sonuçtan önce gönderilen son oydur
+    decisive = max((t for t in sent_at if t <= received_at), default=sent_at[0])
+    return received_at - decisive, payload
+
+
+def run_room(index, args, stats):
+    players = [Player(args.url, f'p{index}_{i}', stats, args.worker, args.codec)
+               for i in range(args.players)]
+    creator = players[0]
+    timeout = args.timeout
+    try:
+        creator.connect()
+        creator.emit('create_room', {'player_name': creator.name, 'room_name': f'load{index}',
+                                     'spy_count': 1})
+        _, created = creator.wait('room_created', 0, timeout)
+        room_id = created['room_id']
+        creator.token = created['resume_token']
+        for player in players:
+            player.room_id = room_id
+        for player in players[1:]:
+            player.connect()
+            player.emit('join_room', {'room_id': room_id, 'player_name': player.name})
+            _, joined = player.wait('room_joined', 0, timeout)
+            player.token = joined['resume_token']
+
+        for player in players:
+            player.emit('heartbeat', {'background': False})
+
+        # Eşitlik turu: oyuncular sırayla ilk iki oyuncuya bölünür
+        tie_targets = [players[1].name if i % 2 == 0 else players[0].name
+                       for i in range(len(players))]
+        # Çoğunluk turu: herkes ikinci oyuncuya (o da birinciye) oy verir
+        win_targets = [players[0].name if i == 1 else players[1].name
+                       for i in range(len(players))]
+
+        for _ in range(args.games):
+            started = creator.mark('role_assigned')
+            creator.emit('start_game', {'room_id': room_id})
+            creator.wait('role_assigned', started, timeout)
+            voting = creator.mark('voting_started')
+            creator.emit('start_voting', {'room_id': room_id})
+            creator.wait('voting_started', voting, timeout)
+            for player in players:
+                player.emit('send_message', {'room_id': room_id, 'message': f'merhaba {player.name}'})
+            if len(players) % 2 == 0:
+                _vote_round(players, tie_targets, 'vote_tie', timeout)
+            latency, _ = _vote_round(players, win_targets, 'game_ended', timeout)
+            with stats.lock:
+                stats.vote_to_end.append(latency)
+                stats.games += 1
+            reset = creator.mark('game_reset')
+            creator.emit('reset_game', {'room_id': room_id})
+            creator.wait('game_reset', reset, timeout)
+
+        # Bağlantı kopma / yeniden bağlanma fırtınası
+        for _ in range(args.storms):
+            for player in players[1:]:
+                player.disconnect()
+            for player in players[1:]:
+                player.new_client()
+                started = time.perf_counter()
+                player.connect()
+                joined = player.mark('room_joined')
+                player.emit('join_room', {'room_id': room_id, 'player_name': player.name,
+                                          'reconnect': True, 'resume_token': player.token,
+                                          'last_seq': player.last_seq, 'has_role': True})
+                received_at, _ = player.wait('room_joined', joined, timeout)
+                with stats.lock:
+                    stats.reconnect.append(received_at - started)
+
+        for player in players:
+            player.emit('leave_room', {'room_id': room_id})
+    except Exception as e:
+        with stats.lock:
+            stats.errors.append(f'room {index}: {e!r}')
+    finally:
+        for player in players:
+            try:
+                player.disconnect()
+            except Exception:
+                pass
+
+
+def _process_status(pid):
+    """Sunucu process'inin RSS (KB) ve thread sayısı (/proc üzerinden)"""
+    status = {}
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('VmRSS', 'Threads'):
+                    status[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return status
+
+
+def _wait_for_port(port, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server did not start on port {port}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=20)
+    parser.add_argument('--players', type=int, default=4, help='players per room')
+    parser.add_argument('--games', type=int, default=2, help='games per room')
+    parser.add_argument('--storms', type=int, default=1, help='disconnect/reconnect storms per room')
+    parser.add_argument('--concurrency', type=int, default=50, help='rooms driven at the same time')
+    parser.add_argument('--timeout', type=float, default=20.0)
+    parser.add_argument('--url', help='existing server; if omitted a local server is started')
+    parser.add_argument('--worker', type=int, default=0, help='worker query parameter')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--async-mode', default='eventlet')
+    parser.add_argument('--codec', choices=('json', 'msgpack'), default='json',
+                        help='wire codec negotiated by every client')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    args = parser.parse_args()
+
+    server = None
+    if not args.url:
+        env = dict(os.environ, PORT=str(args.port), ASYNC_MODE=args.async_mode)
+        # Önceki koşunun odaları geri yüklenmesin, test oyunları geçmişe yazılmasın
+        env.setdefault('SNAPSHOT_PATH', '')
+        env.setdefault('HISTORY_DB', '')
+        server = subprocess.Popen([sys.executable, 'wsgi.py'], cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        _wait_for_port(args.port)
+        args.url = f'http://127.0.0.1:{args.port}'
+
+    stats = Stats()
+    peak = {'VmRSS': 0, 'Threads': 0}
+    sampling = threading.Event()
+
+    def sample():
+        while server and not sampling.wait(0.5):
+            for key, value in _process_status(server.pid).items():
+                peak[key] = max(peak[key], value)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+
+    print(f'{args.rooms} rooms x {args.players} players, {args.games} games, '
+          f'{args.storms} storms against {args.url}', file=sys.stderr)
+    started = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            list(pool.map(lambda i: run_room(i, args, stats), range(args.rooms)))
+        elapsed = time.perf_counter() - started
+        final = _process_status(server.pid) if server else {}
+    finally:
+        sampling.set()
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = {
+        'config': {k: v for k, v in vars(args).items() if k != 'output'},
+        'elapsed_sec': round(elapsed, 3),
+        'games_completed': stats.games,
+        'events_sent': stats.sent,
+        'events_received': stats.received,
+        'events_per_sec': round((stats.sent + stats.received) / elapsed, 1),
+        'submit_vote_to_game_ended': _percentiles(stats.vote_to_end),
+        'reconnect_to_room_joined': _percentiles(stats.reconnect),
+        'server': {
+            'peak_rss_kb': peak['VmRSS'] or None,
+            'peak_threads': peak['Threads'] or None,
+            'final_rss_kb': final.get('VmRSS'),
+            'final_threads': final.get('Threads'),
+        },
+        'errors': stats.errors[:20],
+        'error_count': len(stats.errors),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    return 1 if stats.errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
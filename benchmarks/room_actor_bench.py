@@ -0,0 +1,80 @@
+"""Oda aktörlerinin eşzamanlı aktif oda sayısıyla ölçeklenmesini ölçer.
+
+Her olay kısa bir oda güncellemesi ve ardından ağ yazmasını temsil eden
+bloklayan bir bekleme yapar. Aynı odanın olayları sırayla, farklı odalarınkiler
+paralel işlendiği için aktörlü modelde verim aktif oda sayısıyla artmalı,
+tek global kilitle ise sabit kalmalıdır.
+
+    python benchmarks/room_actor_bench.py [--events 2000] [--io-ms 1]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from actor import RoomActor  # noqa: E402
+
+
+class _Room:
+    def __init__(self):
+        self.actor = RoomActor()
+        self.votes = {}
+
+
+def _run(room_count, events, io_seconds, use_global_lock, workers):
+    rooms = [_Room() for _ in range(room_count)]
+    global_lock = threading.Lock()
+    done = threading.Semaphore(0)
+
+    def apply(room, voter):
+        room.votes[voter] = room.votes.get(voter, 0) + 1
+        time.sleep(io_seconds)
+        done.release()
+
+    def submit(i):
+        room = rooms[i % room_count]
+        if use_global_lock:
+            with global_lock:
+                apply(room, random.randrange(8))
+        else:
+            room.actor.submit(apply, room, random.randrange(8))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(submit, range(events)))
+    for _ in range(events):
+        done.acquire()
+    elapsed = time.perf_counter() - started
+
+    assert sum(sum(r.votes.values()) for r in rooms) == events
+    return events / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=2000)
+    parser.add_argument('--io-ms', type=float, default=1.0)
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument('--rooms', default='1,2,4,8,16,32,64')
+    args = parser.parse_args()
+
+    results = []
+    for room_count in [int(n) for n in args.rooms.split(',')]:
+        row = {'rooms': room_count}
+        for mode, use_global_lock in (('actor', False), ('global_lock', True)):
+            row[f'{mode}_events_per_sec'] = round(
+                _run(room_count, args.events, args.io_ms / 1000, use_global_lock, args.workers), 1)
+        results.append(row)
+        print(f"rooms={room_count:4d}  actor={row['actor_events_per_sec']:10.1f} ev/s  "
+              f"global_lock={row['global_lock_events_per_sec']:10.1f} ev/s", file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
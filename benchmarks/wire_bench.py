@@ -0,0 +1,100 @@
+"""Olay türüne göre JSON ve MessagePack kablo boyutu ve kodlama maliyeti.
+
+Payload'lar gerçek SpyGameRoom metotlarıyla üretilir. Boyut, Engine.IO
+MESSAGE çerçevesinin websocket üzerindeki uzunluğudur (JSON için baştaki
+'4' dahil); polling taşımasında ikili çerçeveler base64 ile ~%33 büyür.
+
+    pip install msgpack
+    python benchmarks/wire_bench.py [--players 8,64]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from socketio import packet  # noqa: E402
+
+import codec  # noqa: E402
+from app import SpyGameRoom, socketio  # noqa: E402
+
+if codec.msgpack is None:
+    sys.exit('msgpack is not installed')
+
+
+def _payloads(player_count):
+    room = SpyGameRoom('K7QX', 'Cuma akşamı', 'sid0', max_players=player_count)
+    for i in range(player_count):
+        room.add_player(f'sid{i}', f'Oyuncu {i}')
+    room.start_game()
+    room.voting_phase = True
+    spy_info, citizen_info = room.role_payloads()
+    for i in range(player_count):
+        room.add_vote(f'sid{i}', 'Oyuncu 1' if i % 3 else 'Oyuncu 0')
+    result = room.check_instant_majority() or room.count_votes()
+    return {
+        'heartbeat': {'background': False},
+        'room_joined': dict(room.to_public(), player_name='Oyuncu 3', is_creator=False,
+                            resume_token=room.players['sid3'].token),
+        'roster_snapshot': room.roster_snapshot(),
+        'player_joined': {'roster': room.roster_delta(added=['sid3']),
+                          'player_count': player_count, 'new_player_name': 'Oyuncu 3'},
+        'game_started': {'message': 'Oyun başladı! 1 hain var. Oylama açık - istediğiniz zaman oy verebilirsiniz.',
+                         'phase': 'voting', 'timer': 0, 'spy_count': 1, 'seq': 12},
+        'role_assigned/spy': spy_info,
+        'role_assigned/citizen': citizen_info,
+        'new_message': {'messages': [{'player_name': 'Oyuncu 3', 'message': 'Bence casus Oyuncu 5, çok sessiz',
+                                      'timestamp': '21:04'}], 'seq': 14},
+        'vote_submitted': {'message': 'Oyuncu 3 oyunu kullandı.', 'seq': 15},
+        'game_ended': {'result': 'citizens_win', 'message': '🎉 Vatandaşlar kazandı!',
+                       'voted_player': result['winner'], 'spy_player': 'Oyuncu 1',
+                       'spy_players': ['Oyuncu 1'], 'country': room.selected_country,
+                       'label': 'Ülke', 'vote_count': result['vote_count'], 'seq': 16},
+    }
+
+
+def _time_per_call(fn, min_seconds=0.05):
+    calls = 0
+    started = time.perf_counter()
+    while True:
+        for _ in range(100):
+            fn()
+        calls += 100
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_seconds:
+            return elapsed / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--players', default='8,64')
+    args = parser.parse_args()
+
+    json_packet = socketio.server.packet_class
+    results = []
+    for player_count in [int(n) for n in args.players.split(',')]:
+        for name, payload in _payloads(player_count).items():
+            pkt = json_packet(packet.EVENT, namespace='/', data=[name.split('/')[0], payload])
+            json_bytes = len(('4' + pkt.encode()).encode('utf-8'))
+            msgpack_bytes = len(codec._to_msgpack(pkt))
+            row = {
+                'event': name,
+                'players': player_count,
+                'json_bytes': json_bytes,
+                'msgpack_bytes': msgpack_bytes,
+                'size_ratio': round(msgpack_bytes / json_bytes, 3),
+                'json_encode_ns': round(_time_per_call(pkt.encode) * 1e9, 1),
+                'msgpack_encode_ns': round(_time_per_call(lambda: codec._to_msgpack(pkt)) * 1e9, 1),
+            }
+            results.append(row)
+            print(f"{name:22s} players={player_count:4d}  json={json_bytes:6d} B  "
+                  f"msgpack={msgpack_bytes:6d} B ({row['size_ratio']:.2f})  "
+                  f"encode {row['json_encode_ns']:8.1f} / {row['msgpack_encode_ns']:8.1f} ns",
+                  file=sys.stderr)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
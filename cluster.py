@@ -0,0 +1,229 @@
+"""Çok process'li çalışma: oda bölümleme ve mesaj kuyruğu arka uçları.
+
+Odalar `room_id` üzerinden worker'lara bölünür; bir odanın tüm durumu ve
+bağlantıları sahibi olan worker'dadır. Worker'lar arası emit'ler
+Flask-SocketIO'nun client manager'ı üzerinden MESSAGE_QUEUE ile taşınır:
+
+    redis://..., amqp://..., kafka://..., zmq+tcp://...  Flask-SocketIO'nun kendi arka uçları
+    unix:///tmp/spy-mq.sock                               aynı makinedeki worker'lar için broker
+    local://                                              tek process içi (test) veri yolu
+
+Tüm worker'ları ve broker'ı tek makinede başlatmak için:
+
+    python cluster.py
+"""
+import logging
+import os
+import pickle
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import zlib
+
+from socketio import PubSubManager
+
+import logs
+
+log = logging.getLogger('spy.cluster')
+
+_HEADER = struct.Struct('!I')
+
+
+def room_owner(room_id, worker_count):
+    """Odanın sahibi olan worker'ın indeksi (tüm process'lerde aynı sonuç)"""
+    if worker_count <= 1:
+        return 0
+    return zlib.crc32(room_id.upper().encode('utf-8')) % worker_count
+
+
+def queue_options(url, channel='flask-socketio'):
+    """MESSAGE_QUEUE adresine göre SocketIO() için anahtar argümanları döner"""
+    if not url:
+        return {}
+    if url.startswith('local://'):
+        return {'client_manager': LocalManager(channel=channel)}
+    if url.startswith('unix://'):
+        return {'client_manager': UnixSocketManager(url[len('unix://'):], channel=channel)}
+    return {'message_queue': url, 'channel': channel}
+
+
+class LocalManager(PubSubManager):
+    """Aynı process içindeki sunucular arasında mesaj taşıyan veri yolu.
+
+    Birden fazla Socket.IO sunucusunu tek process'te çalıştırıp çok worker'lı
+    davranışı denemek için kullanılır.
+    """
+    name = 'local'
+    _subscribers = {}
+    _lock = threading.Lock()
+
+    def initialize(self):
+        self._queue = self.server.eio.create_queue()
+        with self._lock:
+            self._subscribers.setdefault(self.channel, []).append(self._queue)
+        super().initialize()
+
+    def _publish(self, data):
+        message = pickle.dumps(data)
+        with self._lock:
+            queues = list(self._subscribers.get(self.channel, ()))
+        for queue in queues:
+            queue.put(message)
+
+    def _listen(self):
+        while True:
+            yield self._queue.get()
+
+
+def _send_frame(sock, payload):
+    sock.sendall(_HEADER.pack(len(payload)) + payload)
+
+
+def _recv_exact(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError('connection closed')
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _recv_frame(sock):
+    (size,) = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    return _recv_exact(sock, size)
+
+
+class UnixSocketManager(PubSubManager):
+    """Unix socket üzerinden `run_broker` ile konuşan mesaj kuyruğu.
+
+    Redis gerektirmeden aynı makinedeki worker'ları bağlar. Her worker biri
+    yayın biri dinleme için iki bağlantı açar; broker her çerçeveyi kanala
+    abone olan tüm bağlantılara (gönderen dahil) iletir.
+    """
+    name = 'unix'
+
+    def __init__(self, path, channel='flask-socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = path
+        self._publisher = None
+        self._publish_lock = threading.Lock()
+
+    def _connect(self, role):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(self.path)
+        _send_frame(sock, pickle.dumps((role, self.channel)))
+        return sock
+
+    def _publish(self, data):
+        payload = pickle.dumps(data)
+        with self._publish_lock:
+            for retry in (False, True):
+                try:
+                    if self._publisher is None:
+                        self._publisher = self._connect('pub')
+                    _send_frame(self._publisher, payload)
+                    return
+                except OSError:
+                    self._publisher = None
+                    if retry:
+                        raise
+
+    def _listen(self):
+        while True:
+            try:
+                sock = self._connect('sub')
+                while True:
+                    yield _recv_frame(sock)
+            except (OSError, ConnectionError):
+                self._get_logger().error('Message broker connection lost, retrying')
+                self.server.sleep(1)
+
+
+def run_broker(path):
+    """UnixSocketManager için basit yayın/abone broker'ı"""
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o600)
+    server.listen(128)
+    subscribers = {}  # kanal -> {bağlantı: yazma kilidi}
+    lock = threading.Lock()
+
+    def serve(conn):
+        try:
+            role, channel = pickle.loads(_recv_frame(conn))
+            if role == 'sub':
+                with lock:
+                    subscribers.setdefault(channel, {})[conn] = threading.Lock()
+                # Abone bağlantısı kapanana kadar bekle
+                while conn.recv(1):
+                    pass
+                return
+            while True:
+                payload = _recv_frame(conn)
+                frame = _HEADER.pack(len(payload)) + payload
+                with lock:
+                    targets = list(subscribers.get(channel, {}).items())
+                for target, target_lock in targets:
+                    try:
+                        with target_lock:
+                            target.sendall(frame)
+                    except OSError:
+                        with lock:
+                            subscribers.get(channel, {}).pop(target, None)
+        except (OSError, ConnectionError):
+            pass
+        finally:
+            with lock:
+                for conns in subscribers.values():
+                    conns.pop(conn, None)
+            conn.close()
+
+    log.info('message broker listening', extra=logs.fields(path=path))
+    while True:
+        conn, _ = server.accept()
+        threading.Thread(target=serve, args=(conn,), daemon=True).start()
+
+
+def main():
+    """Broker'ı ve her çekirdek için bir gunicorn worker'ını başlatır.
+
+    Worker `i`, BASE_PORT + i portunu dinler. İstemciler `worker` sorgu
+    parametresiyle doğru worker'a yönlendirilmelidir (bkz. deploy/nginx.conf).
+    """
+    worker_count = int(os.environ.get('WORKER_COUNT') or os.cpu_count() or 1)
+    base_port = int(os.environ.get('BASE_PORT', 8000))
+    queue_url = os.environ.setdefault('MESSAGE_QUEUE', 'unix:///tmp/spy-mq.sock')
+
+    processes = []
+    if queue_url.startswith('unix://'):
+        processes.append(subprocess.Popen(
+            [sys.executable, __file__, 'broker', queue_url[len('unix://'):]]))
+
+    for index in range(worker_count):
+        env = dict(os.environ, WORKER_COUNT=str(worker_count),
+                   WORKER_INDEX=str(index), PORT=str(base_port + index))
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'wsgi:app'], env=env))
+
+    try:
+        for process in processes:
+            process.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == 'broker':
+        logs.configure(os.environ.get('LOG_LEVEL', 'INFO'), os.environ.get('LOG_FORMAT', 'text'))
+        run_broker(sys.argv[2])
+    else:
+        main()
@@ -0,0 +1,117 @@
+"""Bağlantı başına seçilen MessagePack kodlaması (isteğe bağlı).
+
+İstemci bağlanırken sorgu parametresinde `codec=msgpack` gönderirse o
+bağlantının tüm Socket.IO paketleri MessagePack ile kodlanır ve çözülür;
+parametreyi göndermeyen (eski) istemciler JSON ile çalışmaya devam eder.
+İstemci tarafı socket.io-msgpack-parser'ın paket formatını kullanır
+(socket.io.msgpack.min.js paketi).
+
+Paketler önce her zamanki gibi JSON'a bir kez kodlanır; MessagePack hâli
+yalnızca msgpack kullanan bir alıcı çıktığında ve yine emit başına bir kez
+üretilir. `msgpack` kurulu değilse `install()` hiçbir şey yapmaz.
+"""
+from urllib.parse import parse_qs
+
+from engineio import packet as eio_packet
+from socketio import packet
+
+import metrics
+
+try:
+    import msgpack
+except ImportError:  # isteğe bağlı bağımlılık
+    msgpack = None
+
+
+def _to_msgpack(pkt):
+    # socket.io-msgpack-parser boş alanları `null` değil eksik bekler
+    d = {'type': pkt.packet_type, 'nsp': pkt.namespace or '/'}
+    if pkt.data is not None:
+        d['data'] = pkt.data
+    if pkt.id is not None:
+        d['id'] = pkt.id
+    return msgpack.packb(d)
+
+
+class _Encoded(str):
+    """Paketin JSON metni; msgpack karşılığı gerektiğinde bir kez üretilir"""
+
+    def msgpack_packet(self):
+        encoded = self.__dict__.get('_msgpack')
+        if encoded is None:
+            encoded = self._msgpack = _to_msgpack(self.packet)
+        # Engine.IO paketi kodlamasını b64 olup olmamasından bağımsız önbelleğe
+        # alır; websocket ve polling alıcıları aynı paketi paylaşamaz
+        return eio_packet.Packet(eio_packet.MESSAGE, encoded)
+
+
+class NegotiatedPacket(packet.Packet):
+    def encode(self):
+        encoded = super().encode()
+        if isinstance(encoded, str):
+            encoded = _Encoded(encoded)
+            encoded.packet = self
+        return encoded
+
+
+class NegotiatedServer:
+    """socketio.Server'a eklenen, bağlantı başına kodlama seçen metotlar"""
+
+    def _handle_eio_connect(self, eio_sid, environ):
+        if 'msgpack' in parse_qs(environ.get('QUERY_STRING', '')).get('codec', ()):
+            self.msgpack_sids.add(eio_sid)
+        return super()._handle_eio_connect(eio_sid, environ)
+
+    def _handle_eio_disconnect(self, eio_sid):
+        try:
+            return super()._handle_eio_disconnect(eio_sid)
+        finally:
+            self.msgpack_sids.discard(eio_sid)
+
+    def _handle_eio_message(self, eio_sid, data):
+        if eio_sid not in self.msgpack_sids or not isinstance(data, bytes):
+            return super()._handle_eio_message(eio_sid, data)
+        decoded = msgpack.unpackb(data)
+        namespace = decoded.get('nsp')
+        packet_type = decoded['type']
+        if packet_type == packet.CONNECT:
+            self._handle_connect(eio_sid, namespace, decoded.get('data'))
+        elif packet_type == packet.DISCONNECT:
+            self._handle_disconnect(eio_sid, namespace)
+        elif packet_type == packet.EVENT:
+            self._handle_event(eio_sid, namespace, decoded.get('id'), decoded.get('data'))
+        elif packet_type == packet.ACK:
+            self._handle_ack(eio_sid, namespace, decoded.get('id'), decoded.get('data'))
+        else:
+            raise ValueError('Unexpected packet type in msgpack message.')
+
+    def _send_packet(self, eio_sid, pkt):
+        if eio_sid in self.msgpack_sids:
+            encoded = _to_msgpack(pkt)
+            # Bu yol JSON'a hiç uğramaz, CountingJSON yerine byte'ları burada say
+            if isinstance(pkt.data, list) and pkt.data and isinstance(pkt.data[0], str):
+                metrics.registry.record_emit(pkt.data[0], len(encoded))
+            self.eio.send(eio_sid, encoded)
+        else:
+            super()._send_packet(eio_sid, pkt)
+
+    def _send_eio_packet(self, eio_sid, eio_pkt):
+        if eio_sid in self.msgpack_sids and isinstance(eio_pkt.data, _Encoded):
+            eio_pkt = eio_pkt.data.msgpack_packet()
+        super()._send_eio_packet(eio_sid, eio_pkt)
+
+
+def install(server):
+    """Sunucuya bağlantı başına msgpack desteği ekler, eklendiyse True döner"""
+    if msgpack is None:
+        return False
+    NegotiatedPacket.json = server.packet_class.json
+    server.packet_class = NegotiatedPacket
+    server.msgpack_sids = set()
+    server.__class__ = type('Negotiated' + type(server).__name__,
+                            (NegotiatedServer, type(server)), {})
+    # Engine.IO olayları eski sınıfın metotlarına bağlıydı; yeniden kaydet
+    server.eio.on('connect', server._handle_eio_connect)
+    server.eio.on('message', server._handle_eio_message)
+    server.eio.on('disconnect', server._handle_eio_disconnect)
+    return True
@@ -0,0 +1,42 @@
+"""Bir kez kodlanmış olayı birçok alıcıya gönderme.
+
+`socketio.emit(..., room=sid)` her çağrıda payload'ı yeniden JSON'a çevirir
+(ve message queue varsa her çağrı için kuyruğa bir mesaj yazar). Aynı
+payload'ı alan oyuncular için paket bir kez kodlanır, hazır Engine.IO
+paketleri her oyuncunun bağlantısına doğrudan yazılır.
+"""
+from engineio import packet as eio_packet
+from socketio import packet
+
+
+def encode(server, event, payload, namespace='/'):
+    """Olayı Engine.IO MESSAGE paketlerine bir kez kodlar"""
+    pkt = server.packet_class(packet.EVENT, namespace=namespace, data=[event, payload])
+    encoded = pkt.encode()
+    if not isinstance(encoded, list):
+        encoded = [encoded]
+    return [eio_packet.Packet(eio_packet.MESSAGE, p) for p in encoded]
+
+
+def send(server, packets, sids, namespace='/'):
+    """Kodlanmış paketleri verilen session id'lere yazar.
+
+    Bu process'te bağlantısı olmayan sid'leri döner; çağıran onlara normal
+    `emit` ile (message queue üzerinden) gönderebilir.
+    """
+    missing = []
+    for sid in sids:
+        eio_sid = server.manager.eio_sid_from_sid(sid, namespace)
+        if eio_sid is None:
+            missing.append(sid)
+            continue
+        for p in packets:
+            server._send_eio_packet(eio_sid, p)
+    return missing
+
+
+def room_sids(server, room, namespace='/'):
+    """Odaya bu process'te katılmış bağlantıların session id'leri"""
+    if namespace not in server.manager.rooms:
+        return []
+    return [sid for sid, _ in server.manager.get_participants(namespace, room)]
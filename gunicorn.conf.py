@@ -0,0 +1,43 @@
+"""gunicorn ayarları - worker sınıfı ASYNC_MODE'a göre seçilir"""
+import os
+
+ASYNC_MODE = os.environ.setdefault('ASYNC_MODE', 'eventlet')
+# Sunucu olarak çalışırken odalar snapshot'a yazılır ({worker} worker indeksiyle değişir);
+# app.py'de varsayılan kapalıdır, modülü import eden araçlar dosyaya dokunmaz
+os.environ.setdefault('SNAPSHOT_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                    'snapshots', 'rooms-{worker}.jsonl'))
+
+WORKER_CLASSES = {
+    'eventlet': 'eventlet',
+    # gevent modunda websocket için gevent-websocket paketi gerekir
+    'gevent': 'geventwebsocket.gunicorn.workers.GeventWebSocketWorker',
+    'threading': 'gthread',
+}
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = WORKER_CLASSES[ASYNC_MODE]
+# Oyun durumu process içinde tutulduğu için tek worker
+workers = 1
+# gthread modunda her bağlantı bir thread tutar
+threads = int(os.environ.get('GUNICORN_THREADS', 100))
+worker_connections = int(os.environ.get('WORKER_CONNECTIONS', 10000))
+timeout = 0 if ASYNC_MODE != 'threading' else 120
+keepalive = 75
+
+
+def post_worker_init(worker):
+    """Snapshot'ı devral; SIGTERM'de önce odaları snapshot'a yaz, sonra gunicorn'un
+    normal kapanışına geç"""
+    import signal
+
+    from app import drain_rooms, start_snapshots
+
+    start_snapshots()
+
+    handle_exit = signal.getsignal(signal.SIGTERM)
+
+    def handle_term(signum, frame):
+        drain_rooms()
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, handle_term)
@@ -0,0 +1,203 @@
+"""Biten oyunların SQLite geçmişi ve istatistik sorguları.
+
+Socket handler'ları diske hiç dokunmaz: `record()` oyunu bellekteki bir
+kuyruğa bırakır, yazıcı kuyruktakileri toplu transaction'lar hâlinde yazar.
+Yazıcı eventlet/gevent altında da gerçek bir OS thread'idir (bkz. native.py),
+sorgular da bir OS thread havuzunda çalışır; sqlite çağrıları olay döngüsünü
+hiç bekletmez.
+
+Her worker yalnızca kendi dosyasına yazar (`peers` diğer worker'ların
+dosyalarıdır). Sorgular bu dosyaları salt okunur bağlayıp (ATTACH) hepsinin
+birleşimi üzerinden çalışır. Liderlik tablosu ve oyuncu/oda istatistikleri
+indeksli sorgulardır; HTTP tarafında `TTLCache` ile önbelleğe alınır.
+"""
+import collections
+import os
+import pathlib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+import native
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    room_id TEXT NOT NULL,
+    room_name TEXT,
+    pack TEXT,
+    word TEXT,
+    result TEXT NOT NULL,
+    voted_player TEXT,
+    player_count INTEGER NOT NULL,
+    ended_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    player_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    is_spy INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    votes INTEGER NOT NULL
+);
+-- Liderlik tablosu ve oyuncu istatistikleri tabloya dönmeden bu indeksten okunur
+CREATE INDEX IF NOT EXISTS game_players_player ON game_players(player_key, won, is_spy, name);
+CREATE INDEX IF NOT EXISTS games_room ON games(room_id, ended_at);
+"""
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10, uri=True)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class HistoryStore:
+    def __init__(self, path, peers=(), batch_size=200, flush_interval=1.0, queue_size=10000,
+                 poll_interval=0.05):
+        self.path = path
+        self.peers = list(peers)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.dropped = 0
+        self._games = collections.deque()
+        self._stopping = False
+        self._stopped = False
+        with closing(_connect(path)) as conn:
+            conn.executescript(SCHEMA)
+        native.start_thread(self._run)
+
+    def record(self, game):
+        """Biten oyunu yazılmak üzere kuyruğa bırakır (beklemez; kuyruk doluysa düşürür)"""
+        if len(self._games) >= self.queue_size:
+            self.dropped += 1
+            return
+        self._games.append(game)
+
+    def pending(self):
+        return len(self._games)
+
+    def close(self, timeout=5):
+        """Kuyruktakileri yazıp yazıcıyı durdurur"""
+        self._stopping = True
+        deadline = time.monotonic() + timeout
+        while not self._stopped and time.monotonic() < deadline:
+            native.sleep(self.poll_interval)
+
+    def _run(self):
+        conn = _connect(self.path)
+        try:
+            while self._games or not self._stopping:
+                if not self._games:
+                    native.sleep(self.poll_interval)
+                    continue
+                # İlk oyundan sonra flush_interval boyunca gelenler aynı transaction'a girer
+                deadline = time.monotonic() + self.flush_interval
+                while (len(self._games) < self.batch_size and not self._stopping
+                       and time.monotonic() < deadline):
+                    native.sleep(self.poll_interval)
+                batch = [self._games.popleft() for _ in range(min(len(self._games), self.batch_size))]
+                try:
+                    self._write(conn, batch)
+                except sqlite3.Error:
+                    self.dropped += len(batch)
+        finally:
+            conn.close()
+            self._stopped = True
+
+    @staticmethod
+    def _write(conn, batch):
+        with conn:
+            for game in batch:
+                cur = conn.execute(
+                    'INSERT INTO games (room_id, room_name, pack, word, result, voted_player, '
+                    'player_count, ended_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (game['room_id'], game['room_name'], game['pack'], game['word'], game['result'],
+                     game['voted_player'], len(game['players']), game['ended_at']))
+                spies_won = game['result'] == 'spy_wins'
+                conn.executemany(
+                    'INSERT INTO game_players (game_id, player_key, name, is_spy, won, votes) '
+                    'VALUES (?, ?, ?, ?, ?, ?)',
+                    [(cur.lastrowid, name.lower(), name, is_spy, is_spy == spies_won,
+                      game['votes'].get(name, 0))
+                     for name, is_spy in game['players']])
+
+    # Sorgular - her çağrı kendi bağlantısını bir OS thread'inde açar (sonuçlar
+    # zaten önbellekte tutulur); tablolar tüm worker'ların birleşimi olan
+    # `all_games` ve `all_game_players` görünümleri üzerinden okunur
+
+    def leaderboard(self, limit=20, min_games=1):
+        rows = self._read(
+            'SELECT MAX(name), COUNT(*) AS games, SUM(won) AS wins, SUM(is_spy), '
+            'SUM(is_spy AND won) FROM all_game_players GROUP BY player_key '
+            'HAVING games >= ? ORDER BY wins DESC, games ASC LIMIT ?',
+            (min_games, limit))
+        return [{'name': name, 'games': games, 'wins': wins, 'win_rate': round(wins / games, 3),
+                 'spy_games': spy_games, 'spy_wins': spy_wins}
+                for name, games, wins, spy_games, spy_wins in rows]
+
+    def player_stats(self, name):
+        (stored, games, wins, spy_games, spy_wins), = self._read(
+            'SELECT MAX(name), COUNT(*), COALESCE(SUM(won), 0), COALESCE(SUM(is_spy), 0), '
+            'COALESCE(SUM(is_spy AND won), 0) FROM all_game_players WHERE player_key = ?',
+            (name.lower(),))
+        return {'name': stored or name, 'games': games, 'wins': wins,
+                'win_rate': round(wins / games, 3) if games else None,
+                'spy_games': spy_games, 'spy_wins': spy_wins,
+                'citizen_games': games - spy_games, 'citizen_wins': wins - spy_wins}
+
+    def room_stats(self, room_id, recent=10):
+        (games, spy_wins), = self._read(
+            "SELECT COUNT(*), COALESCE(SUM(result = 'spy_wins'), 0) FROM all_games WHERE room_id = ?",
+            (room_id,))
+        rows = self._read(
+            'SELECT result, word, voted_player, player_count, ended_at FROM all_games '
+            'WHERE room_id = ? ORDER BY ended_at DESC LIMIT ?', (room_id, recent))
+        return {'room_id': room_id, 'games': games, 'spy_wins': spy_wins,
+                'citizen_wins': games - spy_wins,
+                'recent': [{'result': result, 'word': word, 'voted_player': voted,
+                            'player_count': count, 'ended_at': ended_at}
+                           for result, word, voted, count, ended_at in rows]}
+
+    def _read(self, sql, params):
+        return native.offload(self._query, sql, params)
+
+    def _query(self, sql, params):
+        with closing(_connect(self.path)) as conn:
+            sources = ['main']
+            for index, peer in enumerate(peer for peer in self.peers if os.path.exists(peer)):
+                conn.execute(f'ATTACH DATABASE ? AS peer{index}', (pathlib.Path(peer).resolve().as_uri() + '?mode=ro',))
+                sources.append(f'peer{index}')
+            for table in ('games', 'game_players'):
+                conn.execute(f'CREATE TEMP VIEW all_{table} AS '
+                             + ' UNION ALL '.join(f'SELECT * FROM {source}.{table}' for source in sources))
+            return conn.execute(sql, params).fetchall()
+
+
+class TTLCache:
+    """Anahtar başına `ttl` saniye geçerli sonuç önbelleği"""
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """Süresi dolmamış sonucu, yoksa `compute()` sonucunu döner"""
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        value = compute()
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                # Önce süresi dolanları, yetmezse hepsini at
+                self._entries = {k: e for k, e in self._entries.items() if e[0] > now}
+                if len(self._entries) >= self.max_entries:
+                    self._entries.clear()
+            self._entries[key] = (now + self.ttl, value)
+        return value
@@ -0,0 +1,54 @@
+"""Oyuncu canlılığı: bağlantı tazeliği önce taşıma katmanından okunur.
+
+Engine.IO her bağlantıya zaten ping atıp pong bekliyor; bağlantısı açık ve
+son ping'e cevap vermiş bir oyuncu için ayrıca uygulama seviyesinde sinyal
+gerekmez. İstemcinin `heartbeat` olayı yalnızca sekmenin ön/arka plan
+durumunu bildirir ve sunucunun o duruma göre verdiği aralıkla seyrek
+gönderilir. Bayat oyuncular tek bir periyodik taramada bulunur.
+"""
+import time
+
+
+def transport_alive(server, sid, namespace='/'):
+    """sid'in Engine.IO bağlantısı bu process'te açık ve ping'lere cevap veriyor mu"""
+    eio_sid = server.manager.eio_sid_from_sid(sid, namespace)
+    sock = server.eio.sockets.get(eio_sid) if eio_sid else None
+    if sock is None or sock.closing or sock.closed:
+        return False
+    # last_ping yalnızca cevabı beklenen bir ping varken doludur
+    return sock.last_ping is None or time.time() - sock.last_ping <= server.eio.ping_timeout
+
+
+class Liveness:
+    """Heartbeat aralıklarını belirler ve bayat oyuncuları bulur"""
+
+    def __init__(self, server, interval, background_interval, tolerance=2):
+        self.server = server
+        self.foreground_interval = interval
+        self.background_interval = background_interval
+        self.tolerance = tolerance
+
+    def interval(self, background):
+        """İstemcinin bir sonraki heartbeat'e kadar bekleyeceği süre (saniye)"""
+        return self.background_interval if background else self.foreground_interval
+
+    def is_stale(self, player_id, player, now=None):
+        """Oyuncu bağlı görünüyor ama ne taşıması ne heartbeat'i taze mi.
+
+        Taşıması canlı oyuncunun `last_heartbeat` değeri burada tazelenir.
+        """
+        if not player.connected:
+            return False
+        now = now or time.time()
+        if transport_alive(self.server, player_id):
+            player.last_heartbeat = now
+            return False
+        return now - player.last_heartbeat > self.interval(player.background) * self.tolerance
+
+    def stale_players(self, rooms):
+        """Tüm odalardaki bayat (oda id, oyuncu id) çiftleri"""
+        now = time.time()
+        return [(room_id, player_id)
+                for room_id, room in list(rooms.items())
+                for player_id, player in list(room.players.items())
+                if self.is_stale(player_id, player, now)]
@@ -0,0 +1,74 @@
+"""Herkese açık lobi: katılınabilir odaların doluluk sırasına göre indeksi.
+
+Odalar oyuncu sayısına göre kovalara ayrılır; her kova bir listedir ve her
+odanın listedeki yeri ayrıca tutulur. Çıkan odanın yerine listenin son odası
+taşınır, bu yüzden bir odanın yerini değiştirmek O(1)'dir ve kova içindeki
+sıra eklenme sırası değildir. Oyuncu sayısı en fazla `max_players` olduğundan
+kova sayısı küçük ve sabittir; bir sayfa, hangi derinlikte olursa olsun,
+listelerden dilimlenir ve (kova sayısı + sayfa boyu) kadar iştir.
+
+İndeks process'e özeldir; birden fazla worker varken her worker yalnızca
+kendi odalarını bilir (bkz. app.py LOBBY_ENABLED).
+"""
+import threading
+
+
+class LobbyIndex:
+    def __init__(self):
+        self._buckets = {}    # oyuncu sayısı -> room_id listesi
+        self._levels = {}     # room_id -> bulunduğu kova
+        self._positions = {}  # room_id -> kovanın listesindeki yeri
+        self._lock = threading.Lock()
+        self.version = 0    # her değişiklikte artar
+
+    def __len__(self):
+        return len(self._levels)
+
+    def __contains__(self, room_id):
+        return room_id in self._levels
+
+    def update(self, room_id, joinable, players):
+        """Odanın kaydını günceller; indeks değiştiyse True döner"""
+        level = players if joinable else None
+        with self._lock:
+            old = self._levels.get(room_id)
+            if old == level:
+                return False
+            if old is not None:
+                bucket = self._buckets[old]
+                index = self._positions.pop(room_id)
+                last = bucket.pop()
+                if last != room_id:
+                    # Boşalan yere son oda geçer, liste kaydırılmaz
+                    bucket[index] = last
+                    self._positions[last] = index
+                if not bucket:
+                    del self._buckets[old]
+                del self._levels[room_id]
+            if level is not None:
+                bucket = self._buckets.setdefault(level, [])
+                self._positions[room_id] = len(bucket)
+                bucket.append(room_id)
+                self._levels[room_id] = level
+            self.version += 1
+            return True
+
+    def discard(self, room_id):
+        return self.update(room_id, False, 0)
+
+    def page(self, offset, limit):
+        """En dolu odalar önce olmak üzere [offset, offset + limit) aralığındaki
+        oda kodları ve toplam oda sayısı"""
+        room_ids = []
+        with self._lock:
+            for level in sorted(self._buckets, reverse=True):
+                bucket = self._buckets[level]
+                if offset >= len(bucket):
+                    # Kovanın tamamı sayfadan önce kalıyor, içine bakmadan geç
+                    offset -= len(bucket)
+                    continue
+                room_ids.extend(bucket[offset:offset + limit - len(room_ids)])
+                offset = 0
+                if len(room_ids) >= limit:
+                    break
+            return room_ids, len(self._levels)
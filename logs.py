@@ -0,0 +1,173 @@
+"""Kuyruklu, yapılandırılmış loglama.
+
+Handler'lar kaydın mesajını (`msg % args`) ve varsa traceback'ini çağıranın
+thread'inde metne çevirip kaydı sınırlı bir kuyruğa bırakır; sonradan değişen
+nesneler (oda, oyuncu listesi) logu etkilemez. Satırın biçimlendirilmesi ve
+stdout'a yazılması ayrı bir yazıcı thread'inde yapılır. Yazıcı eventlet/gevent
+altında da gerçek bir OS thread'idir (bkz. native.py), yani yazma olay
+döngüsünü bekletmez. Kuyruk doluysa kayıt beklemeden düşürülür ve sayılır,
+socket handler'ı hiçbir zaman I/O beklemez. Olaya ait alanlar `fields()` ile
+verilir ve kayıtla birlikte JSON satırı (`LOG_FORMAT=json`) ya da
+`anahtar=değer` metni olarak yazılır:
+
+    log = logging.getLogger('spy.room')
+    log.info('room deleted', extra=logs.fields(room_id=room_id))
+
+Heartbeat ve oy gibi sık olaylar `sampled(key)` ile örneklenir; oranlar
+`LOG_SAMPLE` ayarından (`heartbeat=0.01,submit_vote=0.1`) okunur.
+"""
+import atexit
+import collections
+import json
+import logging
+import random
+import sys
+import time
+
+import native
+
+_dropped = 0
+_sample_rates = {}
+_writer = None
+_exception_formatter = logging.Formatter()
+
+
+def fields(**values):
+    """`extra=` için yapılandırılmış alanlar"""
+    return {'fields': values}
+
+
+def sampled(key):
+    """Bu olayın kaydı yazılacak mı (LOG_SAMPLE oranıyla; tanımsız olaylar hep yazılır)"""
+    rate = _sample_rates.get(key)
+    return rate is None or random.random() < rate
+
+
+def dropped():
+    """Kuyruk dolu olduğu için düşürülen kayıt sayısı"""
+    return _dropped
+
+
+def parse_sample(spec):
+    """`heartbeat=0.01,submit_vote=0.1` -> {'heartbeat': 0.01, 'submit_vote': 0.1}"""
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        key, _, rate = item.partition('=')
+        rates[key.strip()] = float(rate)
+    return rates
+
+
+class _NonBlockingQueueHandler(logging.Handler):
+    """Kaydın mesajını metne çevirip kuyruğa bırakır; kuyruk doluysa düşürür"""
+
+    def __init__(self, records, queue_size):
+        super().__init__()
+        self.records = records
+        self.queue_size = queue_size
+
+    def emit(self, record):
+        global _dropped
+        if len(self.records) >= self.queue_size:
+            _dropped += 1
+            return
+        # QueueHandler.prepare gibi: args ve traceback burada metne çevrilir, kayıt
+        # yazıcıya değişebilecek nesnelere ve frame'lere referans taşımaz
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        self.records.append(record)
+
+
+class _Writer:
+    """Kuyruğu boşaltan yazıcı; yamalı kilit ya da uyku kullanmaz.
+
+    deque'nun append/popleft işlemleri thread'ler arasında güvenlidir, yazıcı
+    kuyruk boşken `interval` saniye uyur.
+    """
+
+    def __init__(self, records, stream, formatter, interval=0.05):
+        self.records = records
+        self.stream = stream
+        self.formatter = formatter
+        self.interval = interval
+        self.stopping = False
+        self.stopped = False
+
+    def run(self):
+        while True:
+            self.flush()
+            if self.stopping:
+                self.stopped = True
+                return
+            native.sleep(self.interval)
+
+    def flush(self):
+        wrote = False
+        while self.records:
+            record = self.records.popleft()
+            try:
+                self.stream.write(self.formatter.format(record) + '\n')
+            except Exception:
+                continue  # bozuk kayıt yazıcıyı durdurmasın
+            wrote = True
+        if wrote:
+            self.stream.flush()
+
+    def stop(self, timeout=1.0):
+        """Kalan kayıtları yazdırır (çıkışta)"""
+        self.stopping = True
+        deadline = time.monotonic() + timeout
+        while not self.stopped and time.monotonic() < deadline:
+            native.sleep(0.01)
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', ()))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        extra = getattr(record, 'fields', None)
+        if extra:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in extra.items())
+        return line
+
+    def formatTime(self, record, datefmt=None):
+        return time.strftime('%H:%M:%S', time.localtime(record.created)) + f'.{int(record.msecs):03d}'
+
+
+def configure(level='INFO', fmt='text', sample='', queue_size=10000, name='spy'):
+    """`name` logger'ını kuyruk + arka plan yazıcıya bağlar (process başına bir kez)"""
+    global _writer
+    _sample_rates.clear()
+    _sample_rates.update(parse_sample(sample))
+    logger = logging.getLogger(name)
+    logger.setLevel(level.upper())
+    if _writer is not None:
+        return logger
+
+    records = collections.deque()
+    _writer = _Writer(records, sys.stdout, JSONFormatter() if fmt == 'json' else TextFormatter())
+    logger.addHandler(_NonBlockingQueueHandler(records, queue_size))
+    logger.propagate = False
+    native.start_thread(_writer.run)
+    atexit.register(_writer.stop)
+    return logger
@@ -0,0 +1,170 @@
+"""Socket olayları için hafif metrikler ve Prometheus metin formatı.
+
+Her handler `instrument(event)` ile sarılır: çağrı/hata sayıları ve gecikme
+histogramı olay adına göre tutulur. Gauge'lar kayıtlı fonksiyonlarla yalnızca
+/metrics okunurken hesaplanır; sıcak yolda sadece bir `perf_counter` farkı,
+bir `bisect` ve kilit altında birkaç tamsayı artırımı vardır.
+"""
+import bisect
+import functools
+import threading
+import time
+
+from engineio import json as _json
+
+# Saniye cinsinden histogram sınırları
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class EventStats:
+    __slots__ = ('calls', 'errors', 'latency')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.events = {}
+        self.emitted_bytes = {}
+        self.emitted_count = {}
+        self.dropped = {}
+        self._gauges = []
+        # Bu süreyi (saniye) aşan çağrılar `on_slow(event, süre, args)` ile bildirilir; None = kapalı
+        self.slow_threshold = None
+        self.on_slow = None
+
+    def instrument(self, event):
+        """Socket handler'ını çağrı, hata ve gecikme ölçümüyle sarar"""
+        stats = self.events.setdefault(event, EventStats())
+
+        def decorator(f):
+            @functools.wraps(f)
+            def wrapper(*args):
+                started = time.perf_counter()
+                failed = False
+                try:
+                    return f(*args)
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    elapsed = time.perf_counter() - started
+                    with self._lock:
+                        stats.calls += 1
+                        stats.errors += failed
+                        stats.latency.observe(elapsed)
+                    if self.slow_threshold is not None and elapsed >= self.slow_threshold:
+                        self.on_slow(event, elapsed, args)
+            return wrapper
+        return decorator
+
+    def record_emit(self, event, size):
+        with self._lock:
+            self.emitted_bytes[event] = self.emitted_bytes.get(event, 0) + size
+            self.emitted_count[event] = self.emitted_count.get(event, 0) + 1
+
+    def record_drop(self, event, reason):
+        """Handler'a ulaşmadan reddedilen olayı sayar (`rate`, `size`)"""
+        with self._lock:
+            self.dropped[(event, reason)] = self.dropped.get((event, reason), 0) + 1
+
+    def gauge(self, name, help_text, fn):
+        """/metrics okunurken `fn()` ile hesaplanan gauge kaydeder"""
+        self._gauges.append((name, help_text, fn))
+
+    def render(self):
+        """Prometheus metin formatı (0.0.4)"""
+        with self._lock:
+            events = [(name, s.calls, s.errors, list(s.latency.counts), s.latency.sum)
+                      for name, s in sorted(self.events.items())]
+            emitted = sorted(self.emitted_bytes.items())
+            emitted_count = dict(self.emitted_count)
+            dropped = sorted(self.dropped.items())
+
+        lines = [
+            '# HELP spy_socket_events_total Socket.IO handler calls by event.',
+            '# TYPE spy_socket_events_total counter',
+        ]
+        lines += [f'spy_socket_events_total{{event="{name}"}} {calls}'
+                  for name, calls, _, _, _ in events]
+        lines += [
+            '# HELP spy_socket_event_errors_total Socket.IO handler calls that raised.',
+            '# TYPE spy_socket_event_errors_total counter',
+        ]
+        lines += [f'spy_socket_event_errors_total{{event="{name}"}} {errors}'
+                  for name, _, errors, _, _ in events]
+        lines += [
+            '# HELP spy_socket_events_dropped_total Socket.IO events rejected by rate or size limits.',
+            '# TYPE spy_socket_events_dropped_total counter',
+        ]
+        lines += [f'spy_socket_events_dropped_total{{event="{name}",reason="{reason}"}} {count}'
+                  for (name, reason), count in dropped]
+        lines += [
+            '# HELP spy_socket_event_duration_seconds Socket.IO handler latency.',
+            '# TYPE spy_socket_event_duration_seconds histogram',
+        ]
+        for name, calls, _, counts, total in events:
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, counts):
+                cumulative += count
+                lines.append(f'spy_socket_event_duration_seconds_bucket{{event="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'spy_socket_event_duration_seconds_bucket{{event="{name}",le="+Inf"}} {calls}')
+            lines.append(f'spy_socket_event_duration_seconds_sum{{event="{name}"}} {total:.6f}')
+            lines.append(f'spy_socket_event_duration_seconds_count{{event="{name}"}} {calls}')
+
+        lines += [
+            '# HELP spy_emitted_bytes_total Encoded payload bytes per emitted event (once per emit, before fan-out).',
+            '# TYPE spy_emitted_bytes_total counter',
+        ]
+        lines += [f'spy_emitted_bytes_total{{event="{name}"}} {size}' for name, size in emitted]
+        lines += [
+            '# HELP spy_emits_total Emit calls per event.',
+            '# TYPE spy_emits_total counter',
+        ]
+        lines += [f'spy_emits_total{{event="{name}"}} {emitted_count[name]}' for name, _ in emitted]
+
+        for name, help_text, fn in self._gauges:
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {fn()}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+instrument = registry.instrument
+gauge = registry.gauge
+
+
+class CountingJSON:
+    """Socket.IO paketlerini kodlarken olay başına byte sayan json modülü.
+
+    `SocketIO(json=CountingJSON)` ile verilir; paket başına bir kez çalışır.
+    """
+
+    @staticmethod
+    def dumps(data, *args, **kwargs):
+        encoded = _json.dumps(data, *args, **kwargs)
+        if isinstance(data, list) and data and isinstance(data[0], str):
+            registry.record_emit(data[0], len(encoded))
+        return encoded
+
+    @staticmethod
+    def loads(*args, **kwargs):
+        return _json.loads(*args, **kwargs)
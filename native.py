@@ -0,0 +1,46 @@
+"""Green thread yamalarından bağımsız, gerçek OS thread'leri.
+
+eventlet/gevent `threading`, `time.sleep` ve kilitleri yamalar; yamalı bir
+"thread" aslında olay döngüsünde çalışan bir green thread'dir ve içindeki
+her bloklayan çağrı (disk, sqlite, stdout) tüm sunucuyu bekletir. Bu
+modüldeki yardımcılar yamadan önceki asıl fonksiyonları verir; böyle bir
+thread'in içinde yalnızca bunlar (ve yamalanmamış modüller) kullanılmalıdır.
+
+`offload` ise tek bir bloklayan çağrıyı olay döngüsünü bekletmeden bir OS
+thread havuzunda çalıştırır ve sonucu çağıran green thread'e döner.
+"""
+import importlib
+import sys
+
+
+def original(module, name):
+    """Green thread kütüphanesi yamalamış olsa bile asıl (OS seviyesindeki) fonksiyon"""
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher
+        return getattr(patcher.original(module), name)
+    if 'gevent' in sys.modules:
+        from gevent import monkey
+        return monkey.get_original(module, name)
+    return getattr(importlib.import_module(module), name)
+
+
+def start_thread(target, *args):
+    """`target(*args)`'ı gerçek bir OS thread'inde başlatır"""
+    return original('_thread', 'start_new_thread')(target, args)
+
+
+def sleep(seconds):
+    original('time', 'sleep')(seconds)
+
+
+def offload(function, *args):
+    """Bloklayan `function(*args)`'ı OS thread havuzunda çalıştırıp sonucunu döner"""
+    if 'eventlet' in sys.modules:
+        from eventlet import patcher, tpool
+        if patcher.is_monkey_patched('thread'):
+            return tpool.execute(function, *args)
+    elif 'gevent' in sys.modules:
+        from gevent import get_hub, monkey
+        if monkey.is_module_patched('threading'):
+            return get_hub().threadpool.apply(function, args)
+    return function(*args)
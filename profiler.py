@@ -0,0 +1,98 @@
+"""İsteğe bağlı, süre sınırlı örnekleyen profiler.
+
+Çalışırken ayrı bir OS thread'i her `interval` saniyede bir tüm thread'lerin
+Python yığınlarını (`sys._current_frames()`) okur ve aynı yığınları sayar.
+Sonuç flamegraph araçlarının beklediği "collapsed" biçimindedir:
+
+    app.py:handle_submit_vote;app.py:SpyGameRoom.add_vote 42
+
+eventlet/gevent altında tüm green thread'ler ana thread'de çalıştığından
+ana thread'in yığını o an CPU'da olan handler'dır; örnekleyici bu yüzden
+yamalanmamış asıl thread ve `sleep` ile çalışır. Bekleyen (select, kilit,
+kuyruk) yığınlar varsayılan olarak sayılmaz. Kapalıyken hiçbir iş yapılmaz.
+"""
+import collections
+import os
+import sys
+
+import native
+
+# Yığının en üstündeki bu fonksiyonlar CPU kullanmıyor, bekliyor demektir
+IDLE_FUNCTIONS = frozenset({'wait', 'select', 'poll', 'do_poll', 'accept', 'readinto', 'sleep', 'serve_forever'})
+
+
+def _frame_name(code):
+    return f'{os.path.basename(code.co_filename)}:{code.co_qualname}'
+
+
+class SamplingProfiler:
+    def __init__(self, interval=0.005, include_idle=False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.samples = collections.Counter()
+        self.sample_count = 0
+        # Örnekleyici yamalanmamış bir thread olduğundan kilit de yamalanmamış olmalı
+        self._lock = native.original('_thread', 'allocate_lock')()
+        self._running = False
+        self._generation = 0  # her start() bir artırır; eski örnekleyici kendininkini görmeyince çıkar
+
+    @property
+    def running(self):
+        return self._running
+
+    def start(self, duration, include_idle=False):
+        """`duration` saniyelik örneklemeyi başlatır; zaten çalışıyorsa hiçbir ayara
+        dokunmadan False"""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+            self._generation += 1
+            self.include_idle = include_idle
+            self.samples = collections.Counter()
+            self.sample_count = 0
+            generation = self._generation
+        native.start_thread(self._run, duration, generation)
+        return True
+
+    def stop(self):
+        """Örneklemeyi durdurur (thread bir sonraki aralıkta çıkar)"""
+        with self._lock:
+            self._running = False
+
+    def collapsed(self):
+        """Yığın başına örnek sayısı, en sık yığın önce"""
+        with self._lock:
+            samples = collections.Counter(self.samples)
+        return ''.join(f'{stack} {count}\n' for stack, count in samples.most_common())
+
+    def _run(self, duration, generation):
+        monotonic = native.original('time', 'monotonic')
+        sleep = native.original('time', 'sleep')
+        own_thread = native.original('_thread', 'get_ident')()
+        deadline = monotonic() + duration
+        try:
+            while monotonic() < deadline:
+                with self._lock:
+                    # stop() sonrası hemen yeni bir start() gelmiş olabilir; o artık başka bir çalışma
+                    if not self._running or self._generation != generation:
+                        return
+                    self._sample(own_thread)
+                sleep(self.interval)
+        finally:
+            with self._lock:
+                if self._generation == generation:
+                    self._running = False
+
+    def _sample(self, own_thread):
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_thread:
+                continue
+            if not self.include_idle and frame.f_code.co_name in IDLE_FUNCTIONS:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            self.samples[';'.join(reversed(stack))] += 1
+        self.sample_count += 1
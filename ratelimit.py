@@ -0,0 +1,69 @@
+"""Bağlantı başına olay hız sınırı (token bucket).
+
+Her (session id, olay) çifti için bir kova tutulur: kova saniyede `rate`
+jetonla en fazla `burst` jetona kadar dolar, her olay bir jeton harcar.
+Jetonu kalmayan bağlantının olayı handler'a ve oda aktörüne ulaşmadan
+düşürülür; tek bir istemci odadaki herkese yapılan yayınları çoğaltamaz.
+"""
+import threading
+import time
+
+
+def parse_limits(spec, defaults):
+    """`send_message=1/5,default=5/20` biçimindeki ayarı varsayılanların üzerine yazar"""
+    limits = dict(defaults)
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        event, _, value = item.partition('=')
+        rate, _, burst = value.partition('/')
+        limits[event.strip()] = (float(rate), float(burst or rate))
+    return limits
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'stamp', 'throttled')
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.stamp = now
+        self.throttled = False  # son olay reddedildi mi (istemciye bir kez bildirilir)
+
+
+class RateLimiter:
+    """Olay türü başına (rate, burst) sınırı; listede olmayan olaylar `default` kullanır"""
+
+    def __init__(self, limits):
+        self.limits = limits
+        self._buckets = {}  # sid -> {olay: TokenBucket}
+        self._lock = threading.Lock()
+
+    def allow(self, sid, event):
+        """Bir jeton harcar.
+
+        `(True, None)` kabul; `(False, bekleme)` bu sıkışmanın ilk reddi,
+        `bekleme` bir sonraki jetona kalan saniye; `(False, None)` sonraki retler.
+        """
+        rate, burst = self.limits.get(event) or self.limits['default']
+        now = time.monotonic()
+        with self._lock:
+            buckets = self._buckets.get(sid)
+            if buckets is None:
+                buckets = self._buckets[sid] = {}
+            bucket = buckets.get(event)
+            if bucket is None:
+                bucket = buckets[event] = TokenBucket(burst, now)
+            else:
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.stamp) * rate)
+                bucket.stamp = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                bucket.throttled = False
+                return True, None
+            if bucket.throttled:
+                return False, None
+            bucket.throttled = True
+            return False, (1 - bucket.tokens) / rate
+
+    def forget(self, sid):
+        """Kopan bağlantının kovalarını siler"""
+        with self._lock:
+            self._buckets.pop(sid, None)
@@ -0,0 +1,118 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from collections import Counter
+
+import logs
+
+log = logging.getLogger('spy.scheduler')
+
+
+def _start_thread(target):
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    return thread
+
+
+def _kind(key):
+    return key[0] if isinstance(key, tuple) else key
+
+
+class TimerScheduler:
+    """Tüm gecikmeli işleri tek bir arka plan görevinde çalıştıran zamanlayıcı.
+
+    İşler bitiş zamanına göre bir heap'te tutulur ve her biri bir anahtarla
+    kaydedilir. Aynı anahtarla yeniden planlamak eski işi iptal eder. İptal
+    O(1)'dir: kayıt işaretlenir ve heap'in başına geldiğinde atlanır.
+    Bekleyen iş sayısı ne olursa olsun tek bir thread/greenlet kullanılır.
+    """
+
+    # Heap'teki iptal edilmiş kayıtlar bu oranı geçince heap yeniden kurulur
+    COMPACT_MIN = 64
+
+    def __init__(self, start_background_task=None, event_factory=threading.Event):
+        self._start_background_task = start_background_task or _start_thread
+        self._wakeup = event_factory()
+        self._lock = threading.Lock()
+        self._heap = []
+        self._entries = {}
+        self._kinds = Counter()  # anahtar türüne (tuple anahtarın ilk elemanı) göre bekleyen iş
+        self._counter = itertools.count()
+        self._cancelled = 0
+        self._started = False
+
+    def schedule(self, key, delay, callback, *args):
+        """`delay` saniye sonra `callback(*args)` çağrısını planlar"""
+        entry = [time.monotonic() + delay, next(self._counter), key, callback, args]
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self._discard(old_entry)
+            else:
+                self._kinds[_kind(key)] += 1
+            self._entries[key] = entry
+            heapq.heappush(self._heap, entry)
+            wake = self._heap[0] is entry
+            if not self._started:
+                self._started = True
+                self._start_background_task(self._run)
+        if wake:
+            self._wakeup.set()
+
+    def cancel(self, key):
+        """Planlanmış işi iptal eder, iş bulunduysa True döner"""
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return False
+            self._discard(entry)
+            self._kinds[_kind(key)] -= 1
+        return True
+
+    def pending(self, kind=None):
+        """Bekleyen iş sayısı; `kind` verilirse sadece o türdekiler"""
+        if kind is None:
+            return len(self._entries)
+        return self._kinds[kind]
+
+    def _discard(self, entry):
+        # Kilit tutulurken çağrılır; callback'i silinen kayıt iptal sayılır
+        entry[3] = None
+        entry[4] = ()
+        self._cancelled += 1
+        if self._cancelled > self.COMPACT_MIN and self._cancelled * 2 > len(self._heap):
+            self._heap = [e for e in self._heap if e[3] is not None]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+
+    def _run(self):
+        while True:
+            due = []
+            timeout = None
+            with self._lock:
+                now = time.monotonic()
+                while self._heap:
+                    entry = self._heap[0]
+                    if entry[3] is None:
+                        heapq.heappop(self._heap)
+                        self._cancelled -= 1
+                        continue
+                    if entry[0] > now:
+                        timeout = entry[0] - now
+                        break
+                    heapq.heappop(self._heap)
+                    del self._entries[entry[2]]
+                    self._kinds[_kind(entry[2])] -= 1
+                    due.append(entry)
+                self._wakeup.clear()
+
+            for entry in due:
+                try:
+                    entry[3](*entry[4])
+                except Exception:
+                    log.exception('scheduled task failed', extra=logs.fields(key=repr(entry[2])))
+
+            if not due:
+                self._wakeup.wait(timeout)
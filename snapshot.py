@@ -0,0 +1,139 @@
+"""Oda durumunun yalnızca eklemeli (append-only) snapshot dosyası.
+
+Her satır bir odanın son hâlidir (`{"id": ..., ...}`) ya da silindiğini
+bildirir (`{"id": ..., "deleted": true}`). Periyodik snapshot yalnızca
+değişen odaları tek bir `write()` ile dosyanın sonuna ekler. Yüklerken her
+oda için son satır esas alınır; yarım kalmış son satır atlanır. Satır
+sayısı canlı oda sayısının `compact_ratio` katını geçince dosya, her canlı
+oda için tek satır olacak şekilde geçici dosyaya yazılıp atomik olarak
+değiştirilir.
+
+Dosyaya aynı anda yalnızca bir process yazar: sahiplik `<dosya>.lock`
+üzerindeki `flock` ile alınır, process ölünce kilit kendiliğinden bırakılır.
+Kapanan sahip odaların son hâlini ayrı bir devir dosyasına
+(`<dosya>.handoff`) yazar ve kilidi bırakır; yeni process kilidi aldığında
+devir dosyasını okur. Devir dosyası atomik yazılır ve sonunda tamamlandı
+işareti taşır, yarım kalmış bir devir hiç okunmaz.
+"""
+import fcntl
+import json
+import os
+
+# Devir dosyasının son satırı; bu satır yoksa devir tamamlanmamıştır
+HANDOFF_COMPLETE = {'handoff': 'complete'}
+
+
+def _dumps(record):
+    return json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+
+
+def _read_records(path):
+    """Dosyadaki geçerli JSON satırları (yarım yazılmış satırlar atlanır)"""
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue  # çökme anında yarım yazılmış satır
+
+
+def _write_atomic(path, records):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(_dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class SnapshotLog:
+    def __init__(self, path, compact_ratio=4, compact_min=1000):
+        self.path = path
+        self.handoff_path = path + '.handoff'
+        self.compact_ratio = compact_ratio
+        self.compact_min = compact_min
+        self.lines = 0
+        self._lock_fd = None
+
+    @property
+    def owned(self):
+        return self._lock_fd is not None
+
+    def acquire(self):
+        """Dosyanın sahipliğini almayı dener (beklemez); başka bir process tutuyorsa False"""
+        if self._lock_fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    def release(self):
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)  # flock kapanışla bırakılır
+            self._lock_fd = None
+
+    def load(self):
+        """room_id -> son durum; dosya yoksa boş sözlük"""
+        states = {}
+        self.lines = 0
+        try:
+            for record in _read_records(self.path):
+                self.lines += 1
+                if record.get('deleted'):
+                    states.pop(record['id'], None)
+                else:
+                    states[record['id']] = record
+        except FileNotFoundError:
+            pass
+        return states
+
+    def append(self, records):
+        """Kayıtları dosyanın sonuna tek yazmayla ekler"""
+        if not records:
+            return
+        data = ''.join(_dumps(record) + '\n' for record in records).encode('utf-8')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+        self.lines += len(records)
+
+    def needs_compaction(self, live_rooms):
+        return self.lines > max(self.compact_min, live_rooms * self.compact_ratio)
+
+    def compact(self, states):
+        """Dosyayı her canlı oda için tek satırla yeniden yazar (atomik)"""
+        _write_atomic(self.path, states)
+        self.lines = len(states)
+
+    def write_handoff(self, states):
+        """Kapanırken tüm canlı odaların son hâlini devir dosyasına yazar"""
+        _write_atomic(self.handoff_path, list(states) + [HANDOFF_COMPLETE])
+
+    def read_handoff(self):
+        """Tamamlanmış devirdeki room_id -> durum; devir yoksa ya da yarımsa None"""
+        states = {}
+        try:
+            for record in _read_records(self.handoff_path):
+                if record == HANDOFF_COMPLETE:
+                    return states
+                states[record['id']] = record
+        except FileNotFoundError:
+            pass
+        return None
+
+    def remove_handoff(self):
+        try:
+            os.unlink(self.handoff_path)
+        except FileNotFoundError:
+            pass
@@ -12,7 +12,9 @@ const socket = io({
     timeout: 30000,
     // Keep-alive - uzun süreli için optimize
     pingTimeout: 120000, // 2 dakika
-    pingInterval: 60000   // 1 dakika
+    pingInterval: 60000,  // 1 dakika
+    // Çok worker'lı kurulumda odanın sahibi olan worker'a yönlendirme için
+    query: { worker: WORKER_INDEX, codec: WIRE_CODEC }
 });
 
 // Bağlantı durumu yönetimi
@@ -21,7 +23,8 @@ let connectionState = {
     reconnectAttempts: 0,
     lastDisconnectTime: null,
     isReconnecting: false,
-    wasGameStarted: false
+    wasGameStarted: false,
+    isRestarting: false
 };
 
 // Visibility API için değişkenler
@@ -58,17 +61,28 @@ let gameState = {
     players: [],
     gameStarted: false,
     myRole: null,
+    roleData: null,
+    lastSeq: 0, // Görülen son oda olayının sıra numarası (yeniden bağlanınca kaçırılanlar istenir)
     roomId: ROOM_ID,
     playerName: localStorage.getItem('playerName') || 'Oyuncu'
 };
 
+// Oyuncu listesi - sunucudan sürümlü delta olarak güncellenir
+let roster = {
+    version: 0,
+    players: new Map() // id -> {id, name, connected}
+};
+
 // Timer değişkenleri
 let gameTimerInterval = null;
-let gameTimeLeft = 120; // 2 dakika
+let phaseDeadline = null; // Aktif fazın bitişi (sunucu saatiyle epoch ms)
+let clockOffset = 0; // Sunucu saati - yerel saat (room_joined ile güncellenir)
 let currentPhase = 'waiting'; // 'waiting', 'discussion', 'voting'
 
-// Keep-alive ping interval
+// Heartbeat - bağlantı tazeliğini Engine.IO ping/pong'u sağlıyor, heartbeat yalnızca
+// sekme durumunu bildirir; aralığı sunucu sekme durumuna göre belirler (ms)
 let keepAliveInterval = null;
+let heartbeatInterval = 120000;
 
 // Her oyuncu için benzersiz renk üret
 const playerColors = new Map();
@@ -150,6 +164,38 @@ function updatePlayersList(players) {
     }
 }
 
+function renderRoster() {
+    updatePlayersList(Array.from(roster.players.values()));
+}
+
+function requestRosterSnapshot() {
+    socket.emit('request_roster', { room_id: gameState.roomId });
+}
+
+// Sunucudan gelen tam oyuncu listesi
+function applyRosterSnapshot(snapshot) {
+    roster.version = snapshot.version;
+    roster.players = new Map(snapshot.players.map(player => [player.id, player]));
+    renderRoster();
+}
+
+// Sunucudan gelen değişiklik - sürüm atlanmışsa tam listeyi iste
+function applyRosterDelta(delta) {
+    if (!delta || delta.version <= roster.version) {
+        return; // Eski veya zaten uygulanmış değişiklik
+    }
+    if (delta.version !== roster.version + 1) {
+        requestRosterSnapshot();
+        return;
+    }
+    
+    delta.added.forEach(player => roster.players.set(player.id, player));
+    delta.changed.forEach(player => roster.players.set(player.id, player));
+    delta.removed.forEach(id => roster.players.delete(id));
+    roster.version = delta.version;
+    renderRoster();
+}
+
 function addChatMessage(playerName, message, timestamp, isSystem = false) {
     const messageEl = document.createElement('div');
     messageEl.className = 'chat-message';
@@ -180,6 +226,7 @@ function addChatMessage(playerName, message, timestamp, isSystem = false) {
 
 function showRole(roleData) {
     gameState.myRole = roleData.role;
+    gameState.roleData = roleData;
     
     // Rol kartını göster
     roleCard.classList.remove('hidden');
@@ -195,6 +242,7 @@ function showRole(roleData) {
         roleTitle.textContent = roleData.country.toUpperCase();
         roleMessage.textContent = roleData.message;
         countryName.textContent = roleData.country;
+        countryInfo.querySelector('.country-label').textContent = `${roleData.label || 'Ülke'}:`;
         countryInfo.classList.remove('hidden');
     }
     
@@ -272,15 +320,16 @@ function showRoleTemporarily() {
     }, 5000);
 }
 
-function startGameTimer(duration = 120, phase = 'discussion') {
-    gameTimeLeft = duration;
+// Sunucu faz başına bir kez mutlak bitiş zamanı gönderir; geri sayım yerelde çizilir
+function startGameTimer(deadline, phase = 'discussion') {
+    phaseDeadline = deadline;
     currentPhase = phase;
     gameTimer.classList.remove('hidden');
     
     // Timer label'ını güncelle
     const timerLabel = document.getElementById('timerLabel');
     if (phase === 'discussion') {
-        timerLabel.textContent = 'Geçen Süre:';
+        timerLabel.textContent = 'Tartışma Süresi:';
     } else if (phase === 'voting') {
         timerLabel.textContent = 'Oylama Süresi:';
     }
@@ -289,15 +338,20 @@ function startGameTimer(duration = 120, phase = 'discussion') {
         clearInterval(gameTimerInterval);
     }
     
-    gameTimerInterval = setInterval(() => {
-        gameTimeLeft++;  // Artık süreyi artırıyoruz (sayaç olarak)
-        
-        const minutes = Math.floor(gameTimeLeft / 60);
-        const seconds = gameTimeLeft % 60;
-        timerDisplay.textContent = `${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
-        
-        // Otomatik oylama başlatma kaldırıldı - sadece süre gösterici
-    }, 1000);
+    renderTimer();
+    gameTimerInterval = setInterval(renderTimer, 1000);
+}
+
+function renderTimer() {
+    if (!phaseDeadline) {
+        timerDisplay.textContent = '--:--';
+        return;
+    }
+    // Süre dolunca sunucu bir sonraki faza kendisi geçer
+    const left = Math.max(0, Math.ceil((phaseDeadline - (Date.now() + clockOffset)) / 1000));
+    const minutes = Math.floor(left / 60);
+    const seconds = left % 60;
+    timerDisplay.textContent = `${minutes.toString().padStart(2, '0')}:${seconds.toString().padStart(2, '0')}`;
 }
 
 function showVoting(players) {
@@ -359,7 +413,7 @@ function showGameEndModal(data) {
     
     gameEndMessage.innerHTML = `
         ${data.message}<br><br>
-        <strong>🌍 Ülke:</strong> ${data.country}<br>
+        <strong>🌍 ${data.label || 'Ülke'}:</strong> ${data.country}<br>
         <strong>🕵️ Casus:</strong> ${data.spy_player}<br>
         <strong>🗳️ Seçilen:</strong> ${data.voted_player}
     `;
@@ -401,6 +455,7 @@ function resetGame() {
     
     // Oyun durumunu temizle
     gameState.myRole = null;
+    gameState.roleData = null;
     localStorage.removeItem('gameState_' + gameState.roomId);
     
     showNotification('Oyun sıfırlandı! Yeni oyun başlatabilirsiniz.', 'success');
@@ -454,6 +509,7 @@ document.getElementById('homeBtn')?.addEventListener('click', () => {
     // localStorage'ı temizle
     localStorage.removeItem('playerName');
     localStorage.removeItem('gameState_' + gameState.roomId);
+    localStorage.removeItem('resumeToken_' + gameState.roomId);
     
     window.location.href = '/';
 });
@@ -466,9 +522,32 @@ document.getElementById('playAgainBtn')?.addEventListener('click', () => {
 
 // Socket.IO Event Listeners
 
+// Sıra numaralı oda olaylarında son görülen numarayı takip et
+socket.onAny((event, data) => {
+    if (data && typeof data.seq === 'number' && data.seq > gameState.lastSeq) {
+        gameState.lastSeq = data.seq;
+    }
+});
+
+function getResumeToken() {
+    return localStorage.getItem('resumeToken_' + gameState.roomId);
+}
+
+// Odaya (yeniden) katıl - token varsa kimlik ve kaçırılan olaylar geri yüklenir
+function emitJoinRoom(playerName) {
+    socket.emit('join_room', {
+        room_id: gameState.roomId,
+        player_name: playerName,
+        reconnect: true,
+        resume_token: getResumeToken(),
+        last_seq: gameState.lastSeq,
+        has_role: gameState.roleData !== null
+    });
+}
+
 // Oyuncular güncellendi  
 socket.on('player_joined', (data) => {
-    updatePlayersList(data.players);
+    applyRosterDelta(data.roster);
     hideLoadingOverlay();
     
     // Sadece yeni katılan oyuncu mesajı varsa göster
@@ -479,13 +558,19 @@ socket.on('player_joined', (data) => {
 
 // Oyuncu ayrıldı
 socket.on('player_left', (data) => {
-    updatePlayersList(data.players);
+    applyRosterDelta(data.roster);
     // Sadece gerçekten ayrılan oyuncu için mesaj göster
     if (data.player_name && data.player_name !== gameState.playerName) {
         addChatMessage('', `${data.player_name} lobiden ayrıldı 👋`, '', true);
     }
 });
 
+// Oyuncu listesinin tamamı (katılırken veya istek üzerine)
+socket.on('roster_snapshot', (data) => {
+    applyRosterSnapshot(data);
+    hideLoadingOverlay();
+});
+
 // Oyun başladı
 socket.on('game_started', (data) => {
     gameState.gameStarted = true;
@@ -493,8 +578,12 @@ socket.on('game_started', (data) => {
     startVotingBtn.classList.remove('hidden');
     chatInput.classList.remove('hidden');
     addChatMessage('', data.message, '', true);
-    addChatMessage('', '🗳️ İstediğiniz zaman "Oylamayı Başlat" butonuna basabilirsiniz!', '', true);
-    startGameTimer(data.timer || 120, data.phase || 'discussion');
+    if (data.phase === 'voting') {
+        startVotingBtn.classList.add('hidden');
+    } else {
+        addChatMessage('', '🗳️ Süre dolmadan "Oylamayı Başlat" butonuna basabilirsiniz!', '', true);
+    }
+    startGameTimer(data.deadline, data.phase || 'discussion');
 });
 
 // Rol atandı
@@ -511,16 +600,28 @@ socket.on('start_error', (data) => {
     showNotification(data.message, 'error');
 });
 
-// Yeni mesaj
+// Yeni mesajlar - sunucu kısa sürede gelen satırları tek pakette toplar
 socket.on('new_message', (data) => {
-    addChatMessage(data.player_name, data.message, data.timestamp);
+    (data.messages || [data]).forEach((line) => {
+        addChatMessage(line.player_name, line.message, line.timestamp);
+    });
+});
+
+// Sohbet hatası (ör. mesaj çok uzun)
+socket.on('chat_error', (data) => {
+    showNotification(data.message, 'error');
+});
+
+// Olay hız sınırı aşıldı
+socket.on('rate_limited', (data) => {
+    showNotification(`Çok hızlısın! ${Math.ceil(data.retry_after)} saniye sonra tekrar dene.`, 'error');
 });
 
 // Oylama başladı
 socket.on('voting_started', (data) => {
     addChatMessage('', data.message, '', true);
     showVoting(data.players);
-    currentPhase = 'voting';
+    startGameTimer(data.deadline, 'voting');
     startVotingBtn.classList.add('hidden');
 });
 
@@ -540,7 +641,8 @@ socket.on('vote_tie', (data) => {
     }
     addChatMessage('', resultText, '', true);
     
-    // Yeniden oylama
+    // Yeniden oylama - süre baştan başlar
+    startGameTimer(data.deadline, 'voting');
     setTimeout(() => {
         showVoting(data.tied_players.map(name => ({name})));
         addChatMessage('', '🔄 Eşitlik nedeniyle yeniden oylama!', '', true);
@@ -562,7 +664,7 @@ socket.on('game_ended', (data) => {
         resultText += `${player}: ${votes} oy\n`;
     }
     addChatMessage('', resultText, '', true);
-    addChatMessage('', `🌍 Ülke: ${data.country}`, '', true);
+    addChatMessage('', `🌍 ${data.label || 'Ülke'}: ${data.country}`, '', true);
     
     // Modal göster
     setTimeout(() => {
@@ -603,21 +705,26 @@ socket.on('connect', () => {
         loadGameState();
         
         // Otomatik olarak odaya katıl
-        socket.emit('join_room', {
-            room_id: gameState.roomId,
-            player_name: savedPlayerName,
-            reconnect: true,
-            game_state: {
-                was_in_game: connectionState.wasGameStarted,
-                current_phase: currentPhase
-            }
-        });
+        emitJoinRoom(savedPlayerName);
     } else {
         // Eğer kayıtlı isim yoksa ana sayfaya yönlendir
         window.location.href = '/?room=' + gameState.roomId;
     }
 });
 
+// Sunucu yeniden başlatılıyor - oda durumu yeni process'e devrediliyor. Herkes aynı
+// anda bağlanmasın diye yeniden bağlanma rastgele geciktirilir
+socket.on('server_restart', (data) => {
+    if (connectionState.isRestarting) return;
+    connectionState.isRestarting = true;
+    showNotification(data.message, 'info');
+    socket.disconnect();
+    setTimeout(() => {
+        connectionState.isRestarting = false;
+        socket.connect();
+    }, 1000 + Math.random() * 4000);
+});
+
 // Bağlantı koptu
 socket.on('disconnect', (reason) => {
     console.log('Bağlantı koptu:', reason);
@@ -631,7 +738,9 @@ socket.on('disconnect', (reason) => {
     saveGameState();
     
     // Mobil cihazlarda otomatik reconnect için farklı mesaj
-    if (reason === 'transport close' || reason === 'ping timeout') {
+    if (connectionState.isRestarting) {
+        showNotification('Sunucu yeniden başlatılıyor. Birazdan yeniden bağlanılacak...', 'info');
+    } else if (reason === 'transport close' || reason === 'ping timeout') {
         showNotification('Bağlantı koptu. Yeniden bağlanıyor...', 'warning');
     } else {
         showNotification('Sunucu bağlantısı koptu!', 'error');
@@ -673,6 +782,7 @@ socket.on('game_reset', (data) => {
     // Oyun durumunu sıfırla
     gameState.gameStarted = false;
     gameState.myRole = null;
+    gameState.roleData = null;
     currentPhase = 'waiting';
     
     // UI elementlerini sıfırla
@@ -695,7 +805,7 @@ socket.on('game_reset', (data) => {
     }
     
     // UI'yi güncelle
-    updatePlayersList(data.players);
+    renderRoster();
     
     // Chat'e bilgi mesajı ekle
     addChatMessage('', data.message, '', true);
@@ -708,6 +818,22 @@ socket.on('game_reset', (data) => {
     localStorage.removeItem('gameState_' + gameState.roomId);
 });
 
+// Oda bu worker'da değil (yönlendirme yapılandırması hatalı)
+socket.on('room_redirect', (data) => {
+    console.log('Room is served by another worker:', data.room_id);
+    showNotification('Sunucu yönlendirme hatası! Sayfayı yenileyin.', 'error');
+});
+
+// Oda kullanılmadığı için sunucu tarafından kapatıldı
+socket.on('room_closed', (data) => {
+    showNotification(data.message, 'warning');
+    localStorage.removeItem('gameState_' + gameState.roomId);
+    localStorage.removeItem('resumeToken_' + gameState.roomId);
+    setTimeout(() => {
+        window.location.href = '/';
+    }, 4000);
+});
+
 // Oda bulunamadı hatası
 socket.on('join_error', (data) => {
     console.log('Join error received:', data.message);
@@ -723,11 +849,7 @@ socket.on('join_error', (data) => {
         localStorage.setItem('join_retry_' + gameState.roomId, 'true');
         
         setTimeout(() => {
-            socket.emit('join_room', {
-                room_id: gameState.roomId,
-                player_name: savedPlayerName,
-                reconnect: true
-            });
+            emitJoinRoom(savedPlayerName);
         }, 2000);
         
         // 10 saniye sonra retry flag'ini temizle
@@ -790,7 +912,14 @@ roomCodeEl.addEventListener('click', () => {
 
 // Oyuncuların ismini localStorage'a kaydet (diğer sayfalarda kullanmak için)
 socket.on('room_joined', (data) => {
+    if (data.server_time) {
+        clockOffset = data.server_time - Date.now();
+    }
     localStorage.setItem('playerName', data.player_name);
+    if (data.resume_token) {
+        localStorage.setItem('resumeToken_' + data.room_id, data.resume_token);
+    }
+    sendHeartbeat(true);
 });
 
 // Bağlantı durumu göstergesi
@@ -856,16 +985,25 @@ function loadGameState() {
     return false;
 }
 
-// Keep-alive ping gönder
+// Heartbeat gönder; negotiate ise sunucudan bu sekme durumu için aralığı iste
+function sendHeartbeat(negotiate = false) {
+    if (!connectionState.isConnected) return;
+    const data = { background: document.hidden === true };
+    if (!negotiate) {
+        socket.emit('heartbeat', data);
+        return;
+    }
+    socket.emit('heartbeat', data, (reply) => {
+        if (reply && reply.interval && reply.interval * 1000 !== heartbeatInterval) {
+            heartbeatInterval = reply.interval * 1000;
+            startKeepAlive();
+        }
+    });
+}
+
 function startKeepAlive() {
     if (keepAliveInterval) clearInterval(keepAliveInterval);
-    
-    keepAliveInterval = setInterval(() => {
-        if (connectionState.isConnected) {
-            socket.emit('ping', { roomId: gameState.roomId });
-            console.log('Keep-alive ping sent');
-        }
-    }, 45000); // 45 saniyede bir ping (daha az sıklık)
+    keepAliveInterval = setInterval(() => sendHeartbeat(), heartbeatInterval);
 }
 
 function stopKeepAlive() {
@@ -881,8 +1019,8 @@ function handleVisibilityChange() {
         isPageVisible = false;
         console.log('Sayfa arka plana gitti - bağlantı korunuyor');
         
-        // Arka planda da bağlantıyı koru, sadece UI güncellemelerini durdur
-        // Keep-alive devam etsin (ping gönderimi sürsün)
+        // Arka planda da bağlantıyı koru; heartbeat daha seyrek gönderilsin
+        sendHeartbeat(true);
         
     } else {
         isPageVisible = true;
@@ -895,10 +1033,8 @@ function handleVisibilityChange() {
             socket.connect();
         }
         
-        // Keep-alive zaten çalışıyor olmalı ama emin olmak için
-        if (!keepAliveInterval) {
-            startKeepAlive();
-        }
+        // Ön plan aralığına geri dön
+        sendHeartbeat(true);
     }
 }
 
@@ -12,7 +12,9 @@ const socket = io({
     timeout: 30000,
     // Keep-alive - uzun süreli için optimize
     pingTimeout: 120000, // 2 dakika
-    pingInterval: 60000   // 1 dakika
+    pingInterval: 60000,  // 1 dakika
+    // Çok worker'lı kurulumda yeni odalar worker'lara dağılsın diye rastgele worker
+    query: { worker: Math.floor(Math.random() * WORKER_COUNT), codec: WIRE_CODEC }
 });
 
 // Bağlantı durumu yönetimi
@@ -29,6 +31,10 @@ let isPageVisible = true;
 const createRoomForm = document.getElementById('createRoomForm');
 const joinRoomForm = document.getElementById('joinRoomForm');
 const notification = document.getElementById('notification');
+const lobbyList = document.getElementById('lobbyList');
+
+// Lobide izlenen sayfa
+let lobbyPage = 0;
 
 // Notification gösterme fonksiyonu
 function showNotification(message, type = 'info') {
@@ -53,6 +59,8 @@ createRoomForm.addEventListener('submit', (e) => {
     const playerName = document.getElementById('playerName').value.trim();
     const roomName = document.getElementById('roomName').value.trim();
     const spyCount = parseInt(document.getElementById('spyCount').value);
+    const wordPack = document.getElementById('wordPack').value;
+    const isPublic = LOBBY_ENABLED && document.getElementById('publicRoom').checked;
     
     if (!playerName) {
         showNotification('Lütfen adınızı girin!', 'error');
@@ -68,7 +76,9 @@ createRoomForm.addEventListener('submit', (e) => {
     socket.emit('create_room', {
         player_name: playerName,
         room_name: roomName || `${playerName}'in Odası`,
-        spy_count: spyCount
+        spy_count: spyCount,
+        pack: wordPack,
+        public: isPublic
     });
 });
 
@@ -96,11 +106,77 @@ joinRoomForm.addEventListener('submit', (e) => {
     });
 });
 
+// Lobi: açık odaların listesi (sunucu değişiklikleri toplu olarak gönderir)
+function renderLobby(data) {
+    lobbyPage = data.page;
+    lobbyList.innerHTML = '';
+    data.rooms.forEach(room => {
+        const item = document.createElement('li');
+        item.className = 'lobby-room';
+        
+        const info = document.createElement('div');
+        const name = document.createElement('div');
+        name.className = 'lobby-room-name';
+        name.textContent = room.room_name;
+        const meta = document.createElement('div');
+        meta.className = 'lobby-room-meta';
+        meta.textContent = `${room.room_id} · 👥 ${room.player_count}/${room.max_players} · 🕵️ ${room.spy_count} · 📚 ${room.pack_title}`;
+        info.append(name, meta);
+        
+        const joinBtn = document.createElement('button');
+        joinBtn.type = 'button';
+        joinBtn.className = 'btn btn-secondary';
+        joinBtn.textContent = '🔗 Katıl';
+        joinBtn.onclick = () => joinFromLobby(room.room_id);
+        
+        item.append(info, joinBtn);
+        lobbyList.appendChild(item);
+    });
+    
+    const pageCount = Math.ceil(data.total / data.page_size);
+    document.getElementById('lobbyEmpty').classList.toggle('hidden', data.total > 0);
+    document.getElementById('lobbyPager').classList.toggle('hidden', pageCount <= 1);
+    document.getElementById('lobbyPageInfo').textContent = `${data.page + 1} / ${Math.max(pageCount, 1)}`;
+    document.getElementById('lobbyPrev').disabled = data.page === 0;
+    document.getElementById('lobbyNext').disabled = data.page + 1 >= pageCount;
+    
+    // Sayfa boşaldıysa (odalar doldu/başladı) önceki sayfaya dön
+    if (data.rooms.length === 0 && data.page > 0) {
+        showLobbyPage(pageCount > 0 ? pageCount - 1 : 0);
+    }
+}
+
+function showLobbyPage(page) {
+    if (!LOBBY_ENABLED) return;  // çok worker'lı kurulumda lobi kapalı
+    socket.emit('lobby_subscribe', { page: page });
+}
+
+function joinFromLobby(roomId) {
+    document.getElementById('joinRoomId').value = roomId;
+    const nameInput = document.getElementById('joinPlayerName');
+    if (!nameInput.value.trim()) {
+        nameInput.value = document.getElementById('playerName').value.trim();
+    }
+    if (!nameInput.value.trim()) {
+        showNotification('Katılmak için adınızı girin!', 'error');
+        nameInput.focus();
+        return;
+    }
+    joinRoomForm.dispatchEvent(new Event('submit'));
+}
+
+document.getElementById('lobbyPrev').addEventListener('click', () => showLobbyPage(Math.max(lobbyPage - 1, 0)));
+document.getElementById('lobbyNext').addEventListener('click', () => showLobbyPage(lobbyPage + 1));
+
 // Socket.IO event listeners
 
+// Lobi sayfası / toplu lobi güncellemesi
+socket.on('lobby_update', renderLobby);
+
 // Oda oluşturuldu
 socket.on('room_created', (data) => {
     localStorage.setItem('playerName', data.player_name);
+    localStorage.setItem('resumeToken_' + data.room_id, data.resume_token);
     localStorage.setItem('isCreator', data.is_creator);
     showNotification(`Oda oluşturuldu! Kod: ${data.room_id}`, 'success');
     
@@ -132,6 +208,7 @@ socket.on('room_created', (data) => {
 // Odaya katılındı
 socket.on('room_joined', (data) => {
     localStorage.setItem('playerName', data.player_name);
+    localStorage.setItem('resumeToken_' + data.room_id, data.resume_token);
     showNotification(`${data.room_name} odasına katıldınız!`, 'success');
     
     // Oyun sayfasına yönlendir
@@ -140,11 +217,27 @@ socket.on('room_joined', (data) => {
     }, 1500);
 });
 
+// Oda başka bir worker'da - oyun sayfası doğru worker'a bağlanır
+socket.on('room_redirect', (data) => {
+    localStorage.setItem('playerName', data.player_name);
+    window.location.href = `/game/${data.room_id}`;
+});
+
 // Katılma hatası
 socket.on('join_error', (data) => {
     showNotification(data.message, 'error');
 });
 
+// Oda kurma hatası
+socket.on('create_error', (data) => {
+    showNotification(data.message, 'error');
+});
+
+// Olay hız sınırı aşıldı
+socket.on('rate_limited', (data) => {
+    showNotification(`Çok hızlısın! ${Math.ceil(data.retry_after)} saniye sonra tekrar dene.`, 'error');
+});
+
 // Bağlantı kuruldu
 socket.on('connect', () => {
     console.log('Ana sayfa sunucusuna bağlanıldı');
@@ -154,6 +247,9 @@ socket.on('connect', () => {
     
     updateConnectionStatus(true);
     
+    // Yeni bağlantıda lobi aboneliği de yenilenir
+    showLobbyPage(lobbyPage);
+    
     // Reconnection ise bildir
     if (connectionState.reconnectAttempts > 0) {
         showNotification('Bağlantı yeniden kuruldu! 🎉', 'success');
@@ -0,0 +1,170 @@
+"""Kelime paketleri: derlenmiş, mmap ile paylaşılan salt-okunur kelime listeleri.
+
+Kaynak dosyalar `packs/<ad>.txt` (her satırda bir kelime, `# anahtar: değer`
+satırları paket bilgisi), derlenmiş hâlleri `packs/<ad>.pack`:
+
+    MAGIC (8) | meta uzunluğu (u32) | meta (JSON) | kelime sayısı n (u32)
+    | ofsetler ((n + 1) x u32) | UTF-8 kelimeler
+
+Paket ilk kullanıldığında açılır ve mmap edilir; aynı dosyayı açan tüm
+worker process'ler sayfa önbelleğini paylaşır. i. kelime iki ofset okuyup
+tek bir dilimi çözerek O(1)'de alınır. Her oda kendi `WordDeck`'inden çeker:
+deste bitene kadar kelime tekrar etmez.
+
+    python wordpacks.py compile [packs]
+"""
+import json
+import mmap
+import os
+import random
+import struct
+import sys
+import threading
+
+from allocator import ShuffledPool
+
+MAGIC = b'SPYPACK1'
+_U32 = struct.Struct('<I')
+
+
+def compile_pack(source, target):
+    """`.txt` kaynağını `.pack` dosyasına derler (yazma atomik)"""
+    meta = {}
+    words = []
+    with open(source, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('#'):
+                key, sep, value = line[1:].partition(':')
+                if sep:
+                    meta[key.strip()] = value.strip()
+                continue
+            words.append(line.encode('utf-8'))
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False).encode('utf-8')
+    offsets = [0]
+    for word in words:
+        offsets.append(offsets[-1] + len(word))
+
+    tmp = f'{target}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC)
+        f.write(_U32.pack(len(meta_bytes)))
+        f.write(meta_bytes)
+        f.write(_U32.pack(len(words)))
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.write(b''.join(words))
+    os.replace(tmp, target)
+    return len(words)
+
+
+class WordPack:
+    """mmap edilmiş bir `.pack` dosyası; indeksle O(1) kelime erişimi"""
+
+    def __init__(self, name, path):
+        self.name = name
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path}: not a word pack')
+        pos = len(MAGIC)
+        (meta_len,) = _U32.unpack_from(self._map, pos)
+        pos += _U32.size
+        self.meta = json.loads(self._map[pos:pos + meta_len].decode('utf-8'))
+        pos += meta_len
+        (self._count,) = _U32.unpack_from(self._map, pos)
+        self._offsets = pos + _U32.size
+        self._data = self._offsets + (self._count + 1) * _U32.size
+        self.title = self.meta.get('title', name)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start, end = struct.unpack_from('<II', self._map, self._offsets + index * _U32.size)
+        return self._map[self._data + start:self._data + end].decode('utf-8')
+
+
+class WordDeck:
+    """Odaya özel karıştırılmış deste: deste bitene kadar kelime tekrar etmez.
+
+    Yalnızca çekilen kelime sayısı kadar bellek kullanır (bkz. ShuffledPool).
+    """
+
+    __slots__ = ('pack', '_pool')
+
+    def __init__(self, pack, rng=random):
+        self.pack = pack
+        self._pool = ShuffledPool(len(pack), rng)
+
+    def draw(self):
+        if not self._pool:
+            self._pool.reset()  # deste bitti, baştan karıştır
+        return self.pack[self._pool.take()]
+
+
+class PackLibrary:
+    """Bir dizindeki paketleri ilk kullanımda açan (gerekirse derleyen) kütüphane"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._packs = {}
+        self._lock = threading.Lock()
+
+    def names(self):
+        """Kullanılabilir paket adları (kaynak veya derlenmiş dosyası olanlar)"""
+        names = set()
+        for filename in os.listdir(self.directory):
+            base, ext = os.path.splitext(filename)
+            if ext in ('.txt', '.pack'):
+                names.add(base)
+        return sorted(names)
+
+    def __contains__(self, name):
+        return name in self._packs or name in self.names()
+
+    def get(self, name):
+        pack = self._packs.get(name)
+        if pack is not None:
+            return pack
+        with self._lock:
+            pack = self._packs.get(name)
+            if pack is None:
+                pack = self._packs[name] = WordPack(name, self._compiled_path(name))
+        return pack
+
+    def catalog(self):
+        """Oda kurma ekranı için paket listesi"""
+        packs = [self.get(name) for name in self.names()]
+        return [{'name': pack.name, 'title': pack.title, 'size': len(pack)} for pack in packs]
+
+    def _compiled_path(self, name):
+        if os.path.basename(name) != name or name.startswith('.'):
+            raise KeyError(name)
+        source = os.path.join(self.directory, name + '.txt')
+        target = os.path.join(self.directory, name + '.pack')
+        if os.path.exists(source) and (not os.path.exists(target) or
+                                       os.path.getmtime(target) < os.path.getmtime(source)):
+            compile_pack(source, target)
+        if not os.path.exists(target):
+            raise KeyError(name)
+        return target
+
+
+def main(argv):
+    if len(argv) < 2 or argv[1] != 'compile':
+        sys.exit('usage: python wordpacks.py compile [directory]')
+    directory = argv[2] if len(argv) > 2 else os.path.join(os.path.dirname(os.path.abspath(__file__)), 'packs')
+    for filename in sorted(os.listdir(directory)):
+        if filename.endswith('.txt'):
+            source = os.path.join(directory, filename)
+            count = compile_pack(source, source[:-4] + '.pack')
+            print(f'{filename}: {count} words')
+
+
+if __name__ == '__main__':
+    main(sys.argv)
@@ -0,0 +1,26 @@
+"""Üretim giriş noktası.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+ASYNC_MODE ortam değişkeni (threading, eventlet, gevent) hem Socket.IO
+sunucusunu hem de gunicorn worker sınıfını belirler. Green thread kullanan
+modlarda standart kütüphane, uygulama import edilmeden önce yamalanır.
+"""
+import os
+
+ASYNC_MODE = os.environ.setdefault('ASYNC_MODE', 'eventlet')
+
+if ASYNC_MODE == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from app import app, socketio, start_snapshots  # noqa: E402
+
+if __name__ == '__main__':
+    start_snapshots()
+    port = int(os.environ.get('PORT', 5000))
+    socketio.run(app, host='0.0.0.0', port=port, debug=False,
+                 allow_unsafe_werkzeug=(ASYNC_MODE == 'threading'))